@@ -0,0 +1,80 @@
+"""Bellek ölçümü - boştaki grup ve aktif oyun başına bayt
+
+    python bench_memory.py --groups 10000 --players 15
+"""
+import argparse
+import gc
+import logging
+import random
+import tracemalloc
+
+import wampir_bot as wb
+
+def measure(build, count: int) -> float:
+    """build(i) çağrılarının toplam bellek artışını nesne başına bayt olarak döner"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    keep = [build(i) for i in range(count)]
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    # Ölçüm listesinin kendisini çıkar
+    total -= keep.__sizeof__()
+    del keep
+    return total / count
+
+def idle_group(i: int):
+    """Oyun açmadan komut kullanan grup: get_game kayıt oluşturmaz"""
+    group_id = -1_000_000_000_000 - i
+    wb.get_game(group_id)
+    return None
+
+def lobby_game(i: int):
+    group_id = -2_000_000_000_000 - i
+    game = wb.get_game(group_id, create=True)
+    game.group_id = group_id
+    game.set_active(True)
+    return None
+
+def active_game(players: int):
+    def build(i: int):
+        group_id = -3_000_000_000_000 - i
+        game = wb.get_game(group_id, create=True)
+        game.group_id = group_id
+        game.started_by = 1
+        game.set_active(True)
+        for n in range(players):
+            game.add_player(5_000_000_000 + i * 100 + n, f"Oyuncu {n}")
+        game.assign_roles()
+        game.phase = wb.GamePhase.DAY
+        alive = [p.user_id for p in game.get_alive_players()]
+        game.expected_voters = set(alive)
+        for voter in alive:
+            game.tally.add(voter, random.choice(alive))
+        return None
+    return build
+
+def main():
+    parser = argparse.ArgumentParser(description="GameState bellek ölçümü")
+    parser.add_argument("--groups", type=int, default=10000)
+    parser.add_argument("--players", type=int, default=15)
+    args = parser.parse_args()
+    logging.getLogger(wb.__name__).setLevel(logging.WARNING)
+
+    idle = measure(idle_group, args.groups)
+    print(f"💤 Boştaki grup başına: {idle:.0f} bayt (games: {len(wb.games)} kayıt)")
+    wb.games.clear()
+
+    lobby = measure(lobby_game, args.groups)
+    print(f"🎮 Boş lobi başına: {lobby:.0f} bayt")
+    wb.games.clear()
+
+    active = measure(active_game(args.players), max(1, args.groups // 10))
+    print(f"🧛 {args.players} oyunculu aktif oyun başına: {active:.0f} bayt")
+    wb.games.clear()
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,208 @@
 import asyncio
+import atexit
+import base64
+import contextlib
+import contextvars
+import functools
+import heapq
+import itertools
+import json
 import logging
+import logging.handlers
+import multiprocessing
+import queue
 import random
 import os
-from typing import Dict, Set, Optional, Any, List
-from dataclasses import dataclass
-from enum import Enum
+import sqlite3
+import struct
+import time
+from collections import OrderedDict, deque
+from datetime import timedelta
+from typing import Dict, Set, Optional, Any, List, Tuple, Awaitable, Callable, Deque
+from dataclasses import dataclass, field
+from enum import Enum, IntEnum
 
 import telegram
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import RetryAfter
+from telegram.helpers import escape_markdown
 from telegram.ext import (
-    ApplicationBuilder, CommandHandler, CallbackQueryHandler,
+    ApplicationBuilder, CallbackContext, CommandHandler, CallbackQueryHandler,
     ContextTypes
 )
 
-# Logging setup
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+# Logging setup - kayıtlar QueueHandler ile kuyruğa atılır; biçimlendirme ve yazma
+# QueueListener thread'inde yapılır, event loop stdout/disk G/Ç'sinde beklemez
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')  # json | text
+# Faz başına INFO ve altı kayıtların tutulma oranı, ör. "night=0.1,day=0.25"
+# (uyarı ve hatalar hiç örneklenmez)
+LOG_PHASE_SAMPLING = os.getenv('LOG_PHASE_SAMPLING', '')
+LOG_HTTPX_LEVEL = os.getenv('LOG_HTTPX_LEVEL', 'WARNING').upper()
+
+LOG_FIELDS = ("group_id", "user_id", "phase")
+
+class JsonFormatter(logging.Formatter):
+    """Tek satırlık JSON kayıt - group_id/user_id/phase varsa alan olarak eklenir"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for name in LOG_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class PhaseSampler(logging.Filter):
+    """Faz alanı taşıyan düşük seviyeli kayıtları LOG_PHASE_SAMPLING oranında geçir"""
+    
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(getattr(record, "phase", None))
+        return rate is None or random.random() < rate
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """Mesajı kuyruğa biçimlendirmeden koyar - % argümanları listener thread'inde birleşir
+    
+    Değişebilir argümanlar (dict, list...) kayıt anındaki değeri yazılsın diye hemen
+    biçimlendirilir.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args and not (
+            isinstance(record.args, tuple)
+            and all(isinstance(arg, (str, int, float, type(None))) for arg in record.args)
+        ):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    rates = {}
+    for part in spec.split(","):
+        name, _, rate = part.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """Kök logger'ı kuyruk + dinleyici thread hattına bağla"""
+    stream = logging.StreamHandler()
+    if LOG_FORMAT == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    
+    handler = LazyQueueHandler(queue.SimpleQueue())
+    handler.addFilter(PhaseSampler(parse_sampling(LOG_PHASE_SAMPLING)))
+    
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    # PTB her Bot API isteğini INFO'da loglar - varsayılan olarak kapalı
+    logging.getLogger("httpx").setLevel(LOG_HTTPX_LEVEL)
+    
+    listener = logging.handlers.QueueListener(handler.queue, stream, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+log_listener = setup_logging()
 logger = logging.getLogger(__name__)
 
 # Config
 BOT_TOKEN = os.getenv('BOT_TOKEN', '7720847875:AAEp4lX9UM7P5iApIJX_ppvIHJgYn0d0eL8')
 
+# Aynı anda gönderilecek en fazla özel mesaj sayısı (rol dağıtımı vb.)
+PM_FANOUT_CONCURRENCY = int(os.getenv('PM_FANOUT_CONCURRENCY', '8'))
+
+# Telegram hız sınırları (giden mesaj kuyruğu)
+OUTBOUND_GLOBAL_PER_SECOND = int(os.getenv('OUTBOUND_GLOBAL_PER_SECOND', '30'))
+OUTBOUND_CHAT_INTERVAL = float(os.getenv('OUTBOUND_CHAT_INTERVAL', '1.0'))
+OUTBOUND_GROUP_PER_MINUTE = int(os.getenv('OUTBOUND_GROUP_PER_MINUTE', '20'))
+OUTBOUND_MAX_RETRIES = int(os.getenv('OUTBOUND_MAX_RETRIES', '5'))
+
+# Aynı anda işlenebilecek en fazla Update - bir grubun hız sınırını bekleyen
+# handler diğer grupları durdurmaz; oyun durumu grup kilitleriyle korunur
+CONCURRENT_UPDATES = max(1, int(os.getenv('CONCURRENT_UPDATES', '64')))
+
+# Webhook ayarları - WEBHOOK_URL verilirse long polling yerine webhook kullanılır
+# (python-telegram-bot[webhooks] gerekir)
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')  # ör. https://bot.example.com
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', 'telegram')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+
+# Çoklu süreç: WORKER_COUNT > 1 ise bir router getUpdates yapar ve Update'leri
+# grup id'sine göre worker süreçlerine dağıtır (her grup tek worker'a aittir)
+WORKER_COUNT = int(os.getenv('WORKER_COUNT', '1'))
+# Router'ın getUpdates Telegram hatalarından (Conflict vb.) sonra bekleme süresi (saniye)
+ROUTER_ERROR_DELAY = float(os.getenv('ROUTER_ERROR_DELAY', '5'))
+
+# Görsel file_id önbelleği - yeniden başlatmalarda korunur
+MEDIA_CACHE_FILE = os.getenv('MEDIA_CACHE_FILE', 'media_cache.json')
+# Verilirse açılışta tüm görseller bu sohbete yüklenip önbelleğe alınır
+MEDIA_WARMUP_CHAT_ID = os.getenv('MEDIA_WARMUP_CHAT_ID')
+
+# Boştaki oyunları düşürme: TTL (saniye) ve en fazla canlı oyun sayısı (0 = sınırsız)
+GAME_IDLE_TTL = float(os.getenv('GAME_IDLE_TTL', '21600'))
+MAX_LIVE_GAMES = int(os.getenv('MAX_LIVE_GAMES', '0'))
+EVICTION_INTERVAL = float(os.getenv('EVICTION_INTERVAL', '60'))
+
+# Oyun anlık görüntüleri (SQLite) - boş bırakılırsa kapalı
+SNAPSHOT_DB = os.getenv('SNAPSHOT_DB', 'wampir_games.sqlite3')
+SNAPSHOT_FLUSH_INTERVAL = float(os.getenv('SNAPSHOT_FLUSH_INTERVAL', '0.5'))
+
+# Katılma mesajı düzenlemelerini birleştirme penceresi (saniye)
+JOIN_EDIT_DEBOUNCE = float(os.getenv('JOIN_EDIT_DEBOUNCE', '1.5'))
+
+# Gündüz oylaması: oylama mesajında canlı sayım (düzenlemeler birleştirilir)
+# ve her oy için ayrı grup duyurusu - ikisi ayrı ayrı açılıp kapatılabilir
+VOTE_LIVE_TALLY = os.getenv('VOTE_LIVE_TALLY', '1') == '1'
+VOTE_ANNOUNCEMENTS = os.getenv('VOTE_ANNOUNCEMENTS', '0') == '1'
+VOTE_EDIT_INTERVAL = float(os.getenv('VOTE_EDIT_INTERVAL', '2.0'))
+
+# Prometheus metrikleri - METRICS_PORT verilirse /metrics yerel HTTP'den sunulur
+# (0 = kapalı; shard'lı çalışmada her worker METRICS_PORT + shard numarasını dinler)
+METRICS_LISTEN = os.getenv('METRICS_LISTEN', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+
+# İzleme: en yavaş TRACE_SLOWEST buton callback'i span'larıyla bellekte tutulur (0 = kapalı)
+# ve TRACE_ADMIN_IDS'teki kullanıcılar /wtrace ile görebilir ya da TRACE_DUMP_FILE'a yazdırabilir.
+# Faz geçişleri (duraklamalarıyla saniyeler sürer) ayrı bir tamponda tutulur: /wtrace gecis
+TRACE_SLOWEST = int(os.getenv('TRACE_SLOWEST', '20'))
+TRACE_DUMP_FILE = os.getenv('TRACE_DUMP_FILE', 'wampir_traces.json')
+TRACE_TRANSITION_DUMP_FILE = os.getenv('TRACE_TRANSITION_DUMP_FILE', 'wampir_transition_traces.json')
+TRACE_ADMIN_IDS = {int(part) for part in os.getenv('TRACE_ADMIN_IDS', '').split(',') if part.strip()}
+
+# Faz süreleri (saniye) - gruplar /wsure ile kendi sürelerini ayarlayabilir
+JOIN_SECONDS = 60
+NIGHT_SECONDS = 60
+DISCUSSION_SECONDS = 90
+VOTING_SECONDS = 30
+PHASE_SECONDS_MIN = 10
+PHASE_SECONDS_MAX = 600
+
+# Faz geçişlerindeki duyuru araları (saniye)
+TRANSITION_PAUSE = 3
+END_GAME_PAUSE = 5
+
 # GÖRSEL URL'leri - DAHA GÜZEL GÖRSELLER
 IMAGES = {
     "START": "https://images.unsplash.com/photo-1518709268805-4e9042af2176?ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D&auto=format&fit=crop&w=1200&q=80",
@@ -51,29 +231,117 @@ KOYLU_LAKAPLARI = [
 ]
 
 # Global games dictionary - HER GRUP İÇİN AYRI OYUN
-games: Dict[int, 'GameState'] = {}
-state_lock = asyncio.Lock()
+# Sadece oyunu olan gruplar burada tutulur; oyun bitince kayıt silinir
+# Sıra son etkinliğe göredir (en eski başta) - LRU/TTL düşürme buna dayanır
+games: 'OrderedDict[int, GameState]' = OrderedDict()
 
-@dataclass
+@dataclass(slots=True)
 class GameConfig:
     group_id: Optional[int] = None
     started_by: Optional[int] = None
 
 class GamePhase(Enum):
     LOBBY = "lobby"
-    PLAYING = "playing"
+    PLAYING = "playing"  # İki faz arası: sonuçlar işlendi, sıradaki faz açılmadı
     NIGHT = "night"
     DAY = "day"
+    ENDED = "ended"
 
-@dataclass
+# İzin verilen faz geçişleri - GameState.advance() dışında faz değişmez
+# (/wstart ve oyun kapatma reset() ile LOBBY'ye döner)
+PHASE_TRANSITIONS: Dict[GamePhase, Set[GamePhase]] = {
+    GamePhase.LOBBY: {GamePhase.PLAYING},
+    GamePhase.PLAYING: {GamePhase.NIGHT, GamePhase.DAY, GamePhase.ENDED},
+    GamePhase.NIGHT: {GamePhase.PLAYING},
+    GamePhase.DAY: {GamePhase.PLAYING},
+    GamePhase.ENDED: set(),
+}
+
+class Role(Enum):
+    """Rol kimliği - görünen metin (lakap dahil) Player.role'de ayrı tutulur"""
+    VAMPIR = "vampir"
+    DOKTOR = "doktor"
+    KOYLU = "koylu"
+    KURT = "kurt"
+
+@dataclass(slots=True)
 class Player:
     user_id: int
     username: str
-    role: Optional[str] = None
+    role: Optional[str] = None  # Görünen rol metni (köylülerde lakap)
     alive: bool = True
     lakap: Optional[str] = None  # YENİ: Eğlenceli lakap
+    kind: Optional[Role] = None
+    # Markdown mesajlarında kullanılan kaçışlı ad - katılımda bir kez hesaplanır
+    md_name: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.md_name = escape_markdown(self.username)
+
+class VoteTally:
+    """Gündüz oylarının artımlı sayımı
+    
+    Her oy hedef sayacını, hedefin oy verenlerini ve en yüksek oy sayısını günceller;
+    faz sonunda liderler tek geçişte bulunur. Oy değiştirilemediği için çıkarma yoktur.
+    """
+    __slots__ = ("votes", "counts", "voters", "max_votes")
+    
+    def __init__(self):
+        self.clear()
+    
+    def clear(self):
+        self.votes: Dict[int, int] = {}            # oy veren -> hedef
+        self.counts: Dict[int, int] = {}           # hedef -> oy sayısı (ilk oy sırasıyla)
+        self.voters: Dict[int, List[int]] = {}     # hedef -> oy verenler (oy sırasıyla)
+        self.max_votes = 0
+    
+    def add(self, voter_id: int, target_id: int) -> bool:
+        """Oyu say - daha önce oy vermişse False"""
+        if voter_id in self.votes:
+            return False
+        self.votes[voter_id] = target_id
+        count = self.counts.get(target_id, 0) + 1
+        self.counts[target_id] = count
+        self.voters.setdefault(target_id, []).append(voter_id)
+        if count > self.max_votes:
+            self.max_votes = count
+        return True
+    
+    def load(self, votes: Dict[int, int]):
+        """Kayıtlı oylardan sayımı yeniden kur"""
+        self.clear()
+        for voter_id, target_id in votes.items():
+            self.add(voter_id, target_id)
+    
+    def __len__(self) -> int:
+        return len(self.votes)
+    
+    def has_voted(self, voter_id: int) -> bool:
+        return voter_id in self.votes
+    
+    def leaders(self) -> List[int]:
+        """En çok oy alanlar - eşitlikte ilk oy sırası"""
+        return [target_id for target_id, count in self.counts.items() if count == self.max_votes]
+    
+    def standings(self) -> List[Tuple[int, int]]:
+        """(hedef, oy) listesi - çoktan aza, eşitlikte ilk oy sırası"""
+        return sorted(self.counts.items(), key=lambda item: -item[1])
+
+# Tur numaraları süreç genelinde artar: aynı grubun önceki oyunlarından kalan butonlar
+# yeni oyunun turlarıyla çakışmaz. Milisaniye tohumu yeniden başlatmadan sonra da
+# eski numaraların üstünden devam eder.
+_epochs = itertools.count(int(time.time() * 1000))
 
 class GameState:
+    __slots__ = (
+        "phase", "players", "config", "dead", "night_actions", "tally",
+        "expected_voters", "_phase_timer", "_join_timer", "vote_message_id",
+        "_game_active", "join_message_id", "night_button_messages",
+        "join_editor", "_alive", "_alive_by_role", "last_activity", "timer_kind",
+        "vote_editor", "epoch", "alive_version", "keyboard_cache", "render_cache",
+        "transition_task", "transition_token"
+    )
+
     def __init__(self):
         self._reset()
     
@@ -83,15 +351,30 @@ class GameState:
         self.config = GameConfig()
         self.dead: Set[int] = set()
         self.night_actions: Dict[str, Any] = {"vampire": {}, "doctor": None, "kurt": None}
-        self.votes: Dict[int, int] = {}
+        self.tally = VoteTally()
         self.expected_voters: Set[int] = set()
-        self._timer_task: Optional[asyncio.Task] = None
-        self._join_timer_task: Optional[asyncio.Task] = None
-        self.join_time_left: int = 60
+        self._phase_timer: Optional['PhaseTimer'] = None
+        self.timer_kind: Optional[str] = None  # Son kurulan faz zamanlayıcısı: night/discussion/voting
+        self._join_timer: Optional['PhaseTimer'] = None
         self.vote_message_id: Optional[int] = None
         self._game_active: bool = False
         self.join_message_id: Optional[int] = None
         self.night_button_messages: Dict[int, int] = {}  # user_id -> message_id
+        self.join_editor: Optional['CoalescedEditor'] = None
+        self.vote_editor: Optional['CoalescedEditor'] = None
+        self.epoch: int = 0  # Her gece/gündüz açılışında _epochs'tan yenilenir - eski butonları ayırt eder
+        # İndeksler: katılım sırasını korumak için dict kullanılır
+        self._alive: Dict[int, Player] = {}
+        self._alive_by_role: Dict[Role, Dict[int, Player]] = {role: {} for role in Role}
+        # Canlı oyuncu kümesi her değiştiğinde artar; klavye önbelleği buna bağlıdır
+        self.alive_version: int = 0
+        self.keyboard_cache: Optional[Tuple[Tuple[int, str, int], InlineKeyboardMarkup]] = None
+        # Duyuru metni önbelleği: ad -> (anahtar, metin); ilk kullanımda oluşturulur
+        self.render_cache: Optional[Dict[str, Tuple[Any, str]]] = None
+        # Süren faz geçişi (gece sonu, gündüz sonu...) - schedule_transition kurar
+        self.transition_task: Optional[asyncio.Task] = None
+        self.transition_token: Optional[Tuple[str, int]] = None  # Son kurulan geçiş (ad, tur)
+        self.last_activity: float = time.monotonic()
 
     @property
     def group_id(self) -> Optional[int]:
@@ -111,10 +394,15 @@ class GameState:
 
     def reset(self):
         """Clean up tasks before reset - TAM TEMİZLİK"""
-        if self._timer_task and not self._timer_task.done():
-            self._timer_task.cancel()
-        if self._join_timer_task and not self._join_timer_task.done():
-            self._join_timer_task.cancel()
+        if self._phase_timer:
+            self._phase_timer.cancel()
+        if self._join_timer:
+            self._join_timer.cancel()
+        if self.join_editor:
+            self.join_editor.cancel()
+        if self.vote_editor:
+            self.vote_editor.cancel()
+        self.cancel_transition()
         
         self._reset()
         self.phase = GamePhase.LOBBY
@@ -122,7 +410,7 @@ class GameState:
         self.players = {}
         self.dead = set()
         self.night_actions = {"vampire": {}, "doctor": None, "kurt": None}
-        self.votes = {}
+        self.tally.clear()
         self.expected_voters = set()
         self.vote_message_id = None
         self.group_id = None
@@ -131,26 +419,136 @@ class GameState:
         self.night_button_messages.clear()
         logger.info("🛑 Oyun tamamen resetlendi!")
 
+    @property
+    def votes(self) -> Dict[int, int]:
+        """Oy veren -> hedef (salt okunur görünüm, yazma tally üzerinden)"""
+        return self.tally.votes
+
     def is_active(self) -> bool:
         return self._game_active
 
+    def touch(self):
+        """Son etkinlik zamanını güncelle ve LRU sırasında sona taşı"""
+        self.last_activity = time.monotonic()
+        if games.get(self.group_id) is self:
+            games.move_to_end(self.group_id)
+
+    def arm_phase_timer(self, timer: 'PhaseTimer', kind: str):
+        """Faz zamanlayıcısını değiştir - eskisi iptal edilir"""
+        self.touch()
+        if self._phase_timer:
+            self._phase_timer.cancel()
+        self._phase_timer = timer
+        self.timer_kind = kind
+
+    def phase_deadline(self) -> Optional[float]:
+        """Çalışan zamanlayıcının duvar saati (time.time) cinsinden bitişi"""
+        timer = self._join_timer if self.phase == GamePhase.LOBBY else self._phase_timer
+        if timer is None or timer.done():
+            return None
+        return time.time() + timer.remaining()
+
+    def cancel_phase_timer(self):
+        if self._phase_timer:
+            self._phase_timer.cancel()
+            self._phase_timer = None
+
+    def advance(self, source: GamePhase, target: GamePhase) -> bool:
+        """Fazı source'tan target'a geçir - grup kilidi altında çağrılır
+        
+        Faz artık source değilse geçiş başka bir yoldan (zamanlayıcı, son oy) zaten
+        yapılmıştır: False döner ve çağıran hiçbir şey göndermeden çıkar.
+        """
+        if target not in PHASE_TRANSITIONS[source]:
+            raise ValueError(f"Geçersiz faz geçişi: {source.value} -> {target.value}")
+        if self.phase != source:
+            return False
+        self.phase = target
+        if target in (GamePhase.NIGHT, GamePhase.DAY):
+            self.epoch = next(_epochs)
+        return True
+
+    def cancel_transition(self):
+        """Süren faz geçişini iptal et - geçişin kendi içinden çağrılırsa dokunma"""
+        task, self.transition_task = self.transition_task, None
+        if task is None or task.done():
+            return
+        try:
+            current = asyncio.current_task()
+        except RuntimeError:
+            current = None
+        if task is not current:
+            task.cancel()
+
     def set_active(self, active: bool):
         self._game_active = active
 
+    def _alive_changed(self):
+        self.alive_version += 1
+        self.keyboard_cache = None
+
     def add_player(self, user_id: int, username: str) -> bool:
         """Add player if not already in game"""
         if user_id in self.players:
             return False
-        self.players[user_id] = Player(user_id, username)
+        player = Player(user_id, username)
+        self.players[user_id] = player
+        self._alive[user_id] = player
+        self._alive_changed()
         return True
 
+    def remove_player(self, user_id: int):
+        """Lobiden oyuncu çıkar"""
+        player = self.players.pop(user_id, None)
+        if player:
+            self._alive.pop(user_id, None)
+            if player.kind:
+                self._alive_by_role[player.kind].pop(user_id, None)
+            self._alive_changed()
+
+    def load_players(self, players: List[Player]):
+        """Anlık görüntüden oyuncuları ve indeksleri katılım sırasıyla kur"""
+        self.players = {p.user_id: p for p in players}
+        self.dead = {p.user_id for p in players if not p.alive}
+        self._alive = {p.user_id: p for p in players if p.alive}
+        for by_role in self._alive_by_role.values():
+            by_role.clear()
+        for user_id, player in self._alive.items():
+            if player.kind:
+                self._alive_by_role[player.kind][user_id] = player
+        self._alive_changed()
+
     def get_alive_players(self) -> list:
-        return [p for p in self.players.values() if p.alive]
+        return list(self._alive.values())
+
+    def is_alive(self, user_id: int) -> bool:
+        return user_id in self._alive
+
+    def alive_count(self) -> int:
+        return len(self._alive)
+
+    def alive_with_role(self, role: Role) -> List[Player]:
+        return list(self._alive_by_role[role].values())
+
+    def first_alive_with_role(self, role: Role) -> Optional[Player]:
+        return next(iter(self._alive_by_role[role].values()), None)
+
+    def alive_vampire_count(self) -> int:
+        return len(self._alive_by_role[Role.VAMPIR])
+
+    def alive_village_count(self) -> int:
+        """Vampir olmayan canlılar (köylü, doktor, kurt)"""
+        return len(self._alive) - len(self._alive_by_role[Role.VAMPIR])
 
     def kill_player(self, user_id: int):
         if user_id in self.players:
-            self.players[user_id].alive = False
+            player = self.players[user_id]
+            player.alive = False
             self.dead.add(user_id)
+            self._alive.pop(user_id, None)
+            if player.kind:
+                self._alive_by_role[player.kind].pop(user_id, None)
+            self._alive_changed()
 
     def assign_roles(self):
         """Assign roles to players - ALFA KURT ve LAKAPLAR EKLENDİ"""
@@ -170,18 +568,18 @@ class GameState:
         # 10+ oyuncuda Alfa Kurt ekle
         has_kurt = player_count >= 10
         
-        roles_to_assign = []
+        roles_to_assign = []  # (rol kimliği, görünen metin)
         
         # Vampirler
         for _ in range(vampire_count):
-            roles_to_assign.append(ROLES["VAMPIR"])
+            roles_to_assign.append((Role.VAMPIR, ROLES["VAMPIR"]))
         
         # Doktor
-        roles_to_assign.append(ROLES["DOKTOR"])
+        roles_to_assign.append((Role.DOKTOR, ROLES["DOKTOR"]))
         
         # Alfa Kurt (10+ oyuncuda)
         if has_kurt:
-            roles_to_assign.append(ROLES["KURT"])
+            roles_to_assign.append((Role.KURT, ROLES["KURT"]))
         
         # Köylüler (kalanlar)
         koylu_count = player_count - len(roles_to_assign)
@@ -189,17 +587,31 @@ class GameState:
         
         for i in range(koylu_count):
             if i < len(koylu_lakaplari):
-                roles_to_assign.append(koylu_lakaplari[i])  # Lakap ile köylü
+                roles_to_assign.append((Role.KOYLU, koylu_lakaplari[i]))  # Lakap ile köylü
             else:
-                roles_to_assign.append(ROLES["KOYLU"])  # Normal köylü
+                roles_to_assign.append((Role.KOYLU, ROLES["KOYLU"]))  # Normal köylü
         
         # Rolleri karıştır ve dağıt
         random.shuffle(roles_to_assign)
-        for player, role in zip(alive_players, roles_to_assign):
+        for by_role in self._alive_by_role.values():
+            by_role.clear()
+        for player, (kind, role) in zip(alive_players, roles_to_assign):
+            player.kind = kind
             player.role = role
             # Köylü ise lakap kaydet
-            if role in KOYLU_LAKAPLARI or role == ROLES["KOYLU"]:
+            if kind == Role.KOYLU:
                 player.lakap = role
+        
+        # Rol indeksini katılım sırasıyla doldur
+        for user_id, player in self._alive.items():
+            self._alive_by_role[player.kind][user_id] = player
+
+def game_log(game: GameState, user_id: Optional[int] = None) -> Dict[str, Any]:
+    """Log kaydının yapısal alanları (logger.x(..., extra=game_log(game)))"""
+    fields = {"group_id": game.group_id, "phase": game.phase.value}
+    if user_id is not None:
+        fields["user_id"] = user_id
+    return fields
 
 # Role constants
 ROLES = {
@@ -212,103 +624,1600 @@ ROLES = {
 # Application instance
 app = None
 
-def get_game(group_id: int) -> GameState:
-    """Belirli grup için GameState al - Otomatik oluştur"""
-    if group_id not in games:
-        games[group_id] = GameState()
-        logger.info(f"🎮 Yeni oyun instance'ı oluşturuldu: {group_id}")
-    return games[group_id]
+# Bu sürecin shard'ı - tek süreçte 0/1, worker'larda run_worker ayarlar
+SHARD_INDEX = 0
+SHARD_COUNT = 1
+
+# === METRICS ===
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DRIFT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+class Metrics:
+    """Prometheus metin biçiminde sayaçlar, histogramlar ve kazıma anında okunan göstergeler
+    
+    Seriler süreç içinde tutulur; kazıma isteği render() çıktısını alır.
+    """
+    
+    def __init__(self):
+        self._kinds: Dict[str, Tuple[str, str]] = {}                # ad -> (tür, açıklama)
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, List[float]]] = {}  # [kova sayıları..., toplam, adet]
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._gauges: Dict[str, Callable[[], Dict[LabelKey, float]]] = {}
+    
+    def counter(self, name: str, help_text: str):
+        self._kinds[name] = ("counter", help_text)
+        self._counters[name] = {}
+    
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self._kinds[name] = ("histogram", help_text)
+        self._histograms[name] = {}
+        self._buckets[name] = buckets
+    
+    def gauge(self, name: str, help_text: str, collect: Callable[[], Dict[LabelKey, float]]):
+        self._kinds[name] = ("gauge", help_text)
+        self._gauges[name] = collect
+    
+    def inc(self, name: str, amount: float = 1, **labels: str):
+        series = self._counters[name]
+        key = tuple(labels.items())
+        series[key] = series.get(key, 0) + amount
+    
+    def observe(self, name: str, value: float, **labels: str):
+        series = self._histograms[name]
+        key = tuple(labels.items())
+        buckets = self._buckets[name]
+        state = series.get(key)
+        if state is None:
+            state = series[key] = [0.0] * (len(buckets) + 2)
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                state[i] += 1
+        state[-2] += value
+        state[-1] += 1
+    
+    def timed(self, name: str, **labels: str):
+        """Coroutine'in süresini histograma yazan dekoratör"""
+        def decorate(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                started = time.monotonic()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.observe(name, time.monotonic() - started, **labels)
+            return wrapper
+        return decorate
+    
+    def render(self) -> str:
+        lines = []
+        for name, (kind, help_text) in self._kinds.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for key, value in self._counters[name].items():
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+            elif kind == "gauge":
+                try:
+                    samples = self._gauges[name]()
+                except Exception as e:
+                    logger.error("Metrik okuma hatası %s: %s", name, e)
+                    continue
+                for key, value in samples.items():
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+            else:
+                buckets = self._buckets[name]
+                for key, state in self._histograms[name].items():
+                    for bound, count in zip(buckets, state):
+                        lines.append(f"{name}_bucket{_format_labels(key + (('le', f'{bound:g}'),))} {count:g}")
+                    lines.append(f"{name}_bucket{_format_labels(key + (('le', '+Inf'),))} {state[-1]:g}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {state[-2]:g}")
+                    lines.append(f"{name}_count{_format_labels(key)} {state[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    pairs = []
+    for label, value in key:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{label}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+metrics = Metrics()
+metrics.counter("wampir_messages_total", "Gönderim yardımcılarının sonuçları (helper, result)")
+metrics.counter("wampir_retry_after_total", "Telegram'dan alınan 429 RetryAfter cevapları")
+metrics.histogram("wampir_callback_seconds", "Buton callback işleme süresi")
+metrics.histogram("wampir_timer_drift_seconds", "Faz zamanlayıcılarının son tarihten gecikmesi (gerçek saniye)", DRIFT_BUCKETS)
+metrics.counter("wampir_games_started_total", "Rolleri dağıtılıp başlayan oyunlar")
+metrics.counter("wampir_games_finished_total", "Biten oyunlar (winner)")
+metrics.counter("wampir_games_evicted_total", "Bellekten düşürülen oyunlar (reason: idle, lru)")
+
+async def serve_metrics(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Tek istekli minimal HTTP: GET /metrics"""
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        while (await asyncio.wait_for(reader.readline(), timeout=5)).strip():
+            pass
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", metrics.render().encode("utf-8")
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def start_metrics_server() -> Optional[asyncio.AbstractServer]:
+    """METRICS_PORT verilmişse metrik sunucusunu başlat"""
+    if not METRICS_PORT:
+        return None
+    port = METRICS_PORT + SHARD_INDEX
+    try:
+        server = await asyncio.start_server(serve_metrics, METRICS_LISTEN, port)
+    except OSError as e:
+        logger.error("📈 Metrik sunucusu başlatılamadı (%s:%s): %s", METRICS_LISTEN, port, e)
+        return None
+    logger.info("📈 Metrikler: http://%s:%s/metrics", METRICS_LISTEN, port)
+    return server
+
+metrics_server: Optional[asyncio.AbstractServer] = None
+
+# === TRACING ===
+
+class Trace:
+    """Tek bir callback'in süresi ve içindeki span'lar (ad, başlangıç, süre, derinlik)"""
+    __slots__ = ("name", "attrs", "wall", "started", "total", "spans")
+    
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.attrs = attrs
+        self.wall = time.time()
+        self.started = time.monotonic()
+        self.total: Optional[float] = None
+        self.spans: List[Tuple[str, float, float, int]] = []
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            **self.attrs,
+            "at": self.wall,
+            "total_ms": round((self.total or 0.0) * 1000, 2),
+            "spans": [
+                {"name": name, "start_ms": round(start * 1000, 2), "ms": round(duration * 1000, 2), "depth": depth}
+                for name, start, duration, depth in sorted(self.spans, key=lambda span: span[1])
+            ],
+        }
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("wampir_trace", default=None)
+_span_depth: contextvars.ContextVar[int] = contextvars.ContextVar("wampir_span_depth", default=0)
+
+class Tracer:
+    """Buton callback'leri için hafif izleme - en yavaş N iz bir min-heap'te tutulur
+    
+    İz yoksa span() hiçbir şey yapmaz; iz içinde açılan görevler (gather vb.)
+    bağlamı devraldığı için span'ları aynı ize düşer.
+    """
+    
+    def __init__(self, keep: int = TRACE_SLOWEST, title: str = "callback"):
+        self.keep = keep
+        self.title = title
+        self.finished = 0
+        self._slowest: List[Tuple[float, int, Trace]] = []
+        self._seq = itertools.count()
+    
+    @contextlib.asynccontextmanager
+    async def trace(self, name: str, **attrs: Any):
+        if not self.keep or _current_trace.get() is not None:
+            yield None
+            return
+        current = Trace(name, attrs)
+        token = _current_trace.set(current)
+        try:
+            yield current
+        finally:
+            _current_trace.reset(token)
+            current.total = time.monotonic() - current.started
+            self._record(current)
+    
+    @contextlib.contextmanager
+    def span(self, name: str):
+        current = _current_trace.get()
+        if current is None or current.total is not None:
+            yield
+            return
+        depth = _span_depth.get()
+        token = _span_depth.set(depth + 1)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            _span_depth.reset(token)
+            current.spans.append((name, started - current.started, time.monotonic() - started, depth))
+    
+    def spanned(self, name: str):
+        """Coroutine'i span içinde çalıştıran dekoratör (faz geçişleri için)"""
+        def decorate(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorate
+    
+    def traced_handler(self, name: str):
+        """PTB handler'ını (update, context) kök iz olarak çalıştıran dekoratör"""
+        def decorate(func):
+            @functools.wraps(func)
+            async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+                attrs = {}
+                if update.effective_chat:
+                    attrs["chat_id"] = update.effective_chat.id
+                if update.effective_user:
+                    attrs["user_id"] = update.effective_user.id
+                if update.callback_query and update.callback_query.data:
+                    attrs["data"] = update.callback_query.data
+                async with self.trace(name, **attrs):
+                    return await func(update, context)
+            return wrapper
+        return decorate
+    
+    def _record(self, current: Trace):
+        self.finished += 1
+        entry = (current.total, next(self._seq), current)
+        if len(self._slowest) < self.keep:
+            heapq.heappush(self._slowest, entry)
+        elif current.total > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+    
+    def slowest(self) -> List[Trace]:
+        return [entry[2] for entry in sorted(self._slowest, reverse=True)]
+    
+    def clear(self):
+        self._slowest.clear()
+    
+    def dump(self, path: str) -> int:
+        """En yavaş izleri JSON olarak yaz - yazılan iz sayısını döner"""
+        traces = [trace.to_dict() for trace in self.slowest()]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"finished": self.finished, "traces": traces}, f, ensure_ascii=False, indent=1)
+        return len(traces)
+    
+    def render(self, limit: int = 5) -> str:
+        """Admin için kısa özet - en yavaş izler ve en pahalı span'ları"""
+        traces = self.slowest()[:limit]
+        if not traces:
+            return "🔍 Henüz iz yok."
+        blocks = [f"🔍 *En yavaş {len(traces)} {self.title}* ({self.finished} iz içinden)"]
+        for trace in traces:
+            top = sorted(trace.spans, key=lambda span: -span[2])[:4]
+            # Span ve iz adları "_" içerir - Markdown için kaçışlanmalı
+            spans = "".join([f"\n  └ {escape_markdown(name)}: {duration * 1000:.0f} ms" for name, _, duration, _ in top])
+            data = escape_markdown(str(trace.attrs.get("data", "")))
+            blocks.append(f"• {trace.total * 1000:.0f} ms - {escape_markdown(trace.name)} {data}{spans}")
+        return "\n".join(blocks)
+
+tracer = Tracer()
+# Faz geçişleri kendi tamponunda - duraklamaları callback'leri sıralamadan itmesin
+transition_tracer = Tracer(title="faz geçişi")
+
+async def answer_query(query, *args, **kwargs):
+    """query.answer() - izlenen callback'lerde kendi span'ı ile"""
+    with tracer.span("tg.answer_callback_query"):
+        return await query.answer(*args, **kwargs)
+
+# === PER-GROUP LOCKS ===
+
+class GroupLockRegistry:
+    """Her grup için ayrı asyncio.Lock - kimse beklemeyen kilitler silinir"""
+    
+    def __init__(self):
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._holders: Dict[int, int] = {}
+    
+    @contextlib.asynccontextmanager
+    async def hold(self, group_id: int):
+        lock = self._locks.get(group_id)
+        if lock is None:
+            lock = self._locks[group_id] = asyncio.Lock()
+        self._holders[group_id] = self._holders.get(group_id, 0) + 1
+        try:
+            with tracer.span("lock.wait"):
+                await lock.acquire()
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            self._holders[group_id] -= 1
+            if self._holders[group_id] == 0:
+                del self._holders[group_id]
+                del self._locks[group_id]
+    
+    def __len__(self) -> int:
+        return len(self._locks)
+
+group_locks = GroupLockRegistry()
+
+# === OUTBOUND MESSAGE QUEUE ===
+
+class MessagePriority(IntEnum):
+    CRITICAL = 0  # Oylama butonları, ölüm raporları, roller
+    NORMAL = 1    # Süre uyarıları, faz duyuruları
+    FLAVOUR = 2   # "Bir vampir avına çıktı!" gibi süs mesajları
+
+@dataclass(order=True)
+class _OutboundJob:
+    priority: int
+    seq: int
+    chat_id: int = field(compare=False)
+    call: Callable[[], Awaitable[Any]] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    attempts: int = field(default=0, compare=False)
+
+@dataclass
+class _ChatQueue:
+    jobs: List[_OutboundJob] = field(default_factory=list)  # priority heap
+    next_allowed: float = 0.0
+    recent: Deque[float] = field(default_factory=deque)  # son 60 saniyedeki gönderimler
+    version: int = 0
+
+def retry_after_seconds(error: RetryAfter) -> float:
+    """RetryAfter süresi saniye olarak - PTB sürümüne göre int ya da timedelta gelir"""
+    retry_after = error.retry_after
+    return retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+
+class OutboundScheduler:
+    """Telegram hız sınırlarına uyan merkezi giden mesaj kuyruğu
+    
+    Sohbet başına (gruplarda ~1 mesaj/sn ve ~20 mesaj/dk) ve global (~30 mesaj/sn)
+    sınırları uygular, RetryAfter (429) alan mesajı yeniden sıraya koyar ve
+    kritik mesajları süs mesajlarından önce gönderir.
+    """
+    
+    def __init__(
+        self,
+        global_per_second: int = OUTBOUND_GLOBAL_PER_SECOND,
+        chat_interval: float = OUTBOUND_CHAT_INTERVAL,
+        group_per_minute: int = OUTBOUND_GROUP_PER_MINUTE,
+        max_retries: int = OUTBOUND_MAX_RETRIES
+    ):
+        self.global_per_second = global_per_second
+        self.chat_interval = chat_interval
+        self.group_per_minute = group_per_minute
+        self.max_retries = max_retries
+        self.stats: Dict[str, int] = {"sent": 0, "failed": 0, "retry_after": 0}
+        self._chats: Dict[int, _ChatQueue] = {}
+        self._waiting: List[Tuple[float, int, int]] = []    # (not_before, version, chat_id)
+        self._ready: List[Tuple[int, int, int, int]] = []   # (priority, seq, version, chat_id)
+        self._global_recent: Deque[float] = deque()
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()   # süren teslimatlar - GC'ye karşı güçlü referans
+        self._last_gc = 0.0
+    
+    def post(
+        self,
+        chat_id: int,
+        call: Callable[[], Awaitable[Any]],
+        priority: MessagePriority = MessagePriority.NORMAL
+    ) -> asyncio.Future:
+        """Gönderimi kuyruğa al ve beklemeden Telegram cevabının future'ını döndür"""
+        loop = asyncio.get_running_loop()
+        self._ensure_running(loop)
+        job = _OutboundJob(int(priority), next(self._seq), chat_id, call, loop.create_future())
+        self._enqueue(job)
+        return job.future
+    
+    async def submit(
+        self,
+        chat_id: int,
+        call: Callable[[], Awaitable[Any]],
+        priority: MessagePriority = MessagePriority.NORMAL
+    ) -> Any:
+        """Gönderimi kuyruğa al ve Telegram cevabını bekle"""
+        future = self.post(chat_id, call, priority)
+        # Kuyrukta bekleme + Bot API çağrısı
+        with tracer.span(f"tg.{getattr(call, 'func', call).__name__}"):
+            return await future
+    
+    def pending(self) -> int:
+        return sum(len(chat.jobs) for chat in self._chats.values())
+    
+    def _ensure_running(self, loop: asyncio.AbstractEventLoop):
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+    
+    def _enqueue(self, job: _OutboundJob):
+        chat = self._chats.setdefault(job.chat_id, _ChatQueue())
+        heapq.heappush(chat.jobs, job)
+        self._schedule_chat(job.chat_id, chat)
+        self._wakeup.set()
+    
+    def _schedule_chat(self, chat_id: int, chat: _ChatQueue):
+        """Sohbetin en öncelikli işini uygun heap'e koy (eski kayıtlar sürümle elenir)"""
+        chat.version += 1
+        top = chat.jobs[0]
+        now = asyncio.get_running_loop().time()
+        not_before = self._chat_not_before(chat_id, chat, now)
+        if not_before <= now:
+            heapq.heappush(self._ready, (top.priority, top.seq, chat.version, chat_id))
+        else:
+            heapq.heappush(self._waiting, (not_before, chat.version, chat_id))
+    
+    def _chat_not_before(self, chat_id: int, chat: _ChatQueue, now: float) -> float:
+        while chat.recent and now - chat.recent[0] >= 60:
+            chat.recent.popleft()
+        not_before = chat.next_allowed
+        if chat_id < 0 and len(chat.recent) >= self.group_per_minute:
+            not_before = max(not_before, chat.recent[0] + 60)
+        return not_before
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            now = loop.time()
+            
+            while self._waiting and self._waiting[0][0] <= now:
+                _, version, chat_id = heapq.heappop(self._waiting)
+                chat = self._chats.get(chat_id)
+                if chat is None or chat.version != version or not chat.jobs:
+                    continue
+                if self._chat_not_before(chat_id, chat, now) > now:
+                    self._schedule_chat(chat_id, chat)
+                    continue
+                top = chat.jobs[0]
+                heapq.heappush(self._ready, (top.priority, top.seq, version, chat_id))
+            
+            while self._global_recent and now - self._global_recent[0] >= 1.0:
+                self._global_recent.popleft()
+            
+            if self._ready and len(self._global_recent) < self.global_per_second:
+                _, _, version, chat_id = heapq.heappop(self._ready)
+                chat = self._chats.get(chat_id)
+                if chat is None or chat.version != version or not chat.jobs:
+                    continue
+                job = heapq.heappop(chat.jobs)
+                if not job.future.done():
+                    chat.next_allowed = now + self.chat_interval
+                    chat.recent.append(now)
+                    self._global_recent.append(now)
+                    delivery = loop.create_task(self._deliver(job))
+                    self._inflight.add(delivery)
+                    delivery.add_done_callback(self._inflight.discard)
+                if chat.jobs:
+                    self._schedule_chat(chat_id, chat)
+                continue
+            
+            if now - self._last_gc >= 60:
+                self._collect_idle_chats(now)
+            
+            timeout = None
+            if self._waiting:
+                timeout = self._waiting[0][0] - now
+            if self._ready and self._global_recent:
+                global_wait = self._global_recent[0] + 1.0 - now
+                timeout = global_wait if timeout is None else min(timeout, global_wait)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+    
+    def _collect_idle_chats(self, now: float):
+        """Bir dakikadır mesaj gitmeyen boş sohbet kayıtlarını sil"""
+        self._last_gc = now
+        idle = [
+            chat_id for chat_id, chat in self._chats.items()
+            if not chat.jobs and now - chat.next_allowed >= 60
+        ]
+        for chat_id in idle:
+            del self._chats[chat_id]
+    
+    async def _deliver(self, job: _OutboundJob):
+        try:
+            result = await job.call()
+        except RetryAfter as e:
+            self.stats["retry_after"] += 1
+            metrics.inc("wampir_retry_after_total")
+            job.attempts += 1
+            delay = retry_after_seconds(e)
+            if job.attempts > self.max_retries:
+                self.stats["failed"] += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+                return
+            logger.warning("⏳ Sohbet %s: 429 alındı, %.1f sn sonra tekrar denenecek (deneme %s)", job.chat_id, delay, job.attempts)
+            chat = self._chats.setdefault(job.chat_id, _ChatQueue())
+            chat.next_allowed = max(chat.next_allowed, asyncio.get_running_loop().time() + delay)
+            self._enqueue(job)
+            return
+        except Exception as e:
+            self.stats["failed"] += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        
+        self.stats["sent"] += 1
+        if not job.future.done():
+            job.future.set_result(result)
+
+outbound = OutboundScheduler()
+
+# === CLOCK ===
+
+class Clock:
+    """Oyun zamanının kaynağı - faz zamanlayıcıları ve geçiş araları bunu kullanır"""
+    
+    def time(self) -> float:
+        return asyncio.get_running_loop().time()
+    
+    def real_delay(self, seconds: float) -> float:
+        """Oyun saniyesinin gerçek saniye karşılığı"""
+        return seconds
+    
+    async def sleep(self, seconds: float):
+        with tracer.span("pause"):
+            await asyncio.sleep(self.real_delay(seconds))
+
+class WarpClock(Clock):
+    """factor kat hızlı akan saat - testlerde ve simülasyonda tam oyun milisaniyeler sürer"""
+    
+    def __init__(self, factor: float):
+        self.factor = factor
+        self._origin: Optional[float] = None
+    
+    def time(self) -> float:
+        now = asyncio.get_running_loop().time()
+        if self._origin is None:
+            self._origin = now
+        return self._origin + (now - self._origin) * self.factor
+    
+    def real_delay(self, seconds: float) -> float:
+        return seconds / self.factor
+
+clock: Clock = Clock()
+
+def set_clock(new_clock: Clock):
+    """Saati değiştir - zamanlayıcılar kurulmadan önce çağrılmalı"""
+    global clock
+    clock = new_clock
+
+# === PHASE TIMERS ===
+
+class DeadlineHandle:
+    """DeadlineScheduler'a kayıtlı tek bir son tarih"""
+    
+    def __init__(self, when: float, callback: Callable[[], Awaitable[Any]]):
+        self.when = when
+        self.callback = callback
+        self.cancelled = False
+        self.fired = False
+        self._seq = -1
+    
+    def cancel(self):
+        self.cancelled = True
+
+class DeadlineScheduler:
+    """Tüm oyunların zamanlayıcıları için tek heap ve tek uyuyan görev
+    
+    Her faz uyarı noktalarını (30s, 10s) ve bitişi mutlak son tarih olarak kaydeder;
+    görev yalnızca en yakın son tarihte uyanır. Yeniden zamanlama O(log n)'dir,
+    eski heap kayıtları sıraları geldiğinde atılır.
+    """
+    
+    def __init__(self):
+        self._heap: List[Tuple[float, int, DeadlineHandle]] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._callbacks: Set[asyncio.Task] = set()
+    
+    def time(self) -> float:
+        return clock.time()
+    
+    def call_at(self, when: float, callback: Callable[[], Awaitable[Any]]) -> DeadlineHandle:
+        handle = DeadlineHandle(when, callback)
+        self._push(handle)
+        return handle
+    
+    def call_later(self, delay: float, callback: Callable[[], Awaitable[Any]]) -> DeadlineHandle:
+        return self.call_at(self.time() + delay, callback)
+    
+    def reschedule(self, handle: DeadlineHandle, when: float):
+        """Son tarihi taşı - tetiklenmiş handle yeniden kurulur"""
+        handle.when = when
+        handle.cancelled = False
+        handle.fired = False
+        self._push(handle)
+    
+    def __len__(self) -> int:
+        return len(self._heap)
+    
+    def _push(self, handle: DeadlineHandle):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+        handle._seq = next(self._seq)
+        heapq.heappush(self._heap, (handle.when, handle._seq, handle))
+        if self._heap[0][2] is handle:
+            self._wakeup.set()
+    
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = self.time()
+            while self._heap:
+                when, seq, handle = self._heap[0]
+                if handle.cancelled or handle._seq != seq:
+                    heapq.heappop(self._heap)
+                    continue
+                if when > now:
+                    break
+                heapq.heappop(self._heap)
+                handle.fired = True
+                metrics.observe("wampir_timer_drift_seconds", clock.real_delay(now - when))
+                task = asyncio.create_task(self._fire(handle))
+                self._callbacks.add(task)
+                task.add_done_callback(self._callbacks.discard)
+            
+            timeout = clock.real_delay(self._heap[0][0] - now) if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def _fire(self, handle: DeadlineHandle):
+        try:
+            await handle.callback()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Zamanlayıcı hatası: %s", e)
+
+deadlines = DeadlineScheduler()
+
+class PhaseTimer:
+    """Bir oyun fazının uyarı noktaları ve bitiş anı
+    
+    warnings: kalan saniye -> o anda çalışacak coroutine fabrikası
+    """
+    
+    def __init__(
+        self,
+        duration: float,
+        on_expire: Callable[[], Awaitable[Any]],
+        warnings: Optional[Dict[int, Callable[[], Awaitable[Any]]]] = None,
+        scheduler: Optional[DeadlineScheduler] = None
+    ):
+        self._scheduler = scheduler or deadlines
+        self._warnings = warnings or {}
+        self._on_expire = on_expire
+        self._handles: Dict[Optional[int], DeadlineHandle] = {}
+        self._cancelled = False
+        self.deadline = 0.0
+        self._arm(duration)
+    
+    def _arm(self, duration: float):
+        now = self._scheduler.time()
+        self.deadline = now + duration
+        points = [(seconds_left, callback) for seconds_left, callback in self._warnings.items()]
+        points.append((None, self._on_expire))
+        for seconds_left, callback in points:
+            when = self.deadline - (seconds_left or 0)
+            handle = self._handles.get(seconds_left)
+            if seconds_left is not None and when <= now:
+                if handle:
+                    handle.cancel()
+                continue
+            if handle:
+                self._scheduler.reschedule(handle, when)
+            else:
+                self._handles[seconds_left] = self._scheduler.call_at(when, callback)
+    
+    def reset(self, duration: float):
+        """Süreyi yeniden başlat (ör. yeni oyuncu katıldığında)"""
+        if not self.done():
+            self._arm(duration)
+    
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - self._scheduler.time())
+    
+    def cancel(self):
+        self._cancelled = True
+        for handle in self._handles.values():
+            handle.cancel()
+    
+    def done(self) -> bool:
+        return self._cancelled or self._handles[None].fired
+
+# === PHASE TRANSITIONS ===
+
+_transition_tasks: Set[asyncio.Task] = set()
+
+def schedule_transition(game: GameState, make: Callable[[], Awaitable[Any]], label: str) -> Optional[asyncio.Task]:
+    """Faz geçişini oyunun kendi görevinde başlat - çağıran callback/zamanlayıcı hemen döner
+    
+    Bir oyunun geçişleri sırayla çalışır: yeni geçiş öncekinin bitmesini bekler.
+    reset() zinciri iptal eder. Görev boş bir bağlamda başlar ve transition_tracer'da
+    kendi kök izini (transition.<ad>) açar; callback'in izine geçişin duraklamaları
+    karışmaz, faz fonksiyonlarının span'ları bu ize düşer.
+    
+    (ad, tur) geçişin kimliğidir: aynı turda aynı geçiş ikinci kez istenirse
+    (ör. oylama zamanlayıcısı ile son oy aynı anda) yeni görev kurulmaz, None döner.
+    """
+    token = (label, game.epoch)
+    if token == game.transition_token:
+        return None
+    game.transition_token = token
+    previous = game.transition_task
+    
+    async def run():
+        if previous is not None and not previous.done():
+            try:
+                await asyncio.wait([previous])
+            except asyncio.CancelledError:
+                previous.cancel()
+                raise
+        try:
+            async with transition_tracer.trace(f"transition.{label}", group_id=game.group_id):
+                await make()
+        except Exception as e:
+            logger.error("Grup %s: %s geçişi hatası: %s", game.group_id, label, e, extra=game_log(game))
+    
+    task = asyncio.get_running_loop().create_task(run(), context=contextvars.Context())
+    game.transition_task = task
+    _transition_tasks.add(task)
+    
+    def finished(done: asyncio.Task):
+        _transition_tasks.discard(done)
+        if game.transition_task is done:
+            game.transition_task = None
+    
+    task.add_done_callback(finished)
+    return task
+
+def transition_on_expire(game: GameState, make: Callable[[], Awaitable[Any]], label: str) -> Callable[[], Awaitable[None]]:
+    """Zamanlayıcı bitişini oyunun geçiş görevine devreden PhaseTimer callback'i"""
+    async def expire():
+        schedule_transition(game, make, label)
+    return expire
+
+# === COALESCED EDITS ===
+
+class CoalescedEditor:
+    """Tek bir mesajın düzenlemelerini kısa bir pencerede birleştirir
+    
+    touch() değişikliği bildirir; pencere sonunda render() o anki metni üretir
+    ve metin son gönderilenle aynıysa düzenleme hiç yapılmaz. send() başarıda
+    True döner; yalnızca başarılı düzenlemeler "son gönderilen" sayılır.
+    """
+    
+    def __init__(
+        self,
+        render: Callable[[], Optional[Tuple[str, Optional[InlineKeyboardMarkup]]]],
+        send: Callable[[str, Optional[InlineKeyboardMarkup]], Awaitable[bool]],
+        delay: float
+    ):
+        self._render = render
+        self._send = send
+        self.delay = delay
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._last_text: Optional[str] = None
+        self._closed = False
+        self.edits = 0
+        self.skipped = 0
+    
+    def touch(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_later())
+    
+    async def _flush_later(self):
+        await asyncio.sleep(self.delay)
+        await self._flush()
+    
+    async def flush(self):
+        """Bekleyen düzenlemeyi hemen gönder"""
+        if self._task and not self._task.done() and self._task is not asyncio.current_task():
+            self._task.cancel()
+        await self._flush()
+    
+    async def _flush(self):
+        async with self._lock:
+            if self._closed:
+                return
+            rendered = self._render()
+            if rendered is None:
+                return
+            text, reply_markup = rendered
+            if text == self._last_text:
+                self.skipped += 1
+                return
+            if not await self._send(text, reply_markup):
+                # Başarısız düzenleme kaydedilmez; sonraki touch() aynı metni yeniden dener
+                return
+            self._last_text = text
+            self.edits += 1
+    
+    def cancel(self):
+        if self._task and not self._task.done() and self._task is not asyncio.current_task():
+            self._task.cancel()
+    
+    async def close(self):
+        """Yeni düzenleme yapma ve süren düzenlemenin bitmesini bekle"""
+        self._closed = True
+        async with self._lock:
+            pass
+
+# === MEDIA CACHE ===
+
+class MediaCache:
+    """IMAGES anahtarı -> Telegram file_id
+    
+    İlk başarılı send_photo'dan dönen file_id saklanır, sonraki gönderimlerde
+    URL yerine kullanılır. URL değişirse kayıt geçersiz sayılır.
+    """
+    
+    def __init__(self, path: Optional[str] = MEDIA_CACHE_FILE):
+        self.path = path
+        self._entries: Dict[str, Dict[str, str]] = {}  # key -> {"url", "file_id"}
+        self._load()
+    
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._entries = json.load(f)
+            logger.info("🖼️ Görsel önbelleği yüklendi: %s kayıt", len(self._entries))
+        except (OSError, ValueError) as e:
+            logger.error("Görsel önbelleği okunamadı: %s", e)
+            self._entries = {}
+    
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error("Görsel önbelleği yazılamadı: %s", e)
+    
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry and entry.get("url") == IMAGES.get(key):
+            return entry.get("file_id")
+        return None
+    
+    def remember(self, key: str, message: Any):
+        """send_photo cevabındaki en büyük boyutun file_id'sini kaydet"""
+        photos = getattr(message, "photo", None)
+        if not photos:
+            return
+        file_id = photos[-1].file_id
+        url = IMAGES[key]
+        # Aynı URL'yi paylaşan anahtarlar da aynı dosyayı kullanır
+        for other_key, other_url in IMAGES.items():
+            if other_url == url:
+                self._entries[other_key] = {"url": url, "file_id": file_id}
+        self._save()
+        logger.info("🖼️ %s görseli önbelleğe alındı", key)
+    
+    def forget(self, key: str):
+        if self._entries.pop(key, None) is not None:
+            self._save()
+    
+    def missing(self) -> List[str]:
+        return [key for key in IMAGES if not self.get(key)]
+
+media_cache = MediaCache()
+
+async def warm_media_cache(bot, chat_id: int):
+    """Önbellekte olmayan görselleri yükle ve yükleme mesajlarını sil"""
+    for key in media_cache.missing():
+        if media_cache.get(key):
+            continue  # aynı URL'li başka anahtarla birlikte yüklendi
+        try:
+            message = await outbound.submit(
+                chat_id,
+                functools.partial(bot.send_photo, chat_id=chat_id, photo=IMAGES[key], disable_notification=True),
+                MessagePriority.FLAVOUR
+            )
+            media_cache.remember(key, message)
+            await outbound.submit(
+                chat_id,
+                functools.partial(bot.delete_message, chat_id=chat_id, message_id=message.message_id),
+                MessagePriority.FLAVOUR
+            )
+        except Exception as e:
+            logger.error("Görsel ön yükleme hatası (%s): %s", key, e)
+
+# === GAME SNAPSHOTS ===
+
+def snapshot_game(game: GameState) -> Dict[str, Any]:
+    """GameState'in JSON'a yazılabilir anlık görüntüsü"""
+    return {
+        "group_id": game.group_id,
+        "started_by": game.started_by,
+        "phase": game.phase.value,
+        "active": game.is_active(),
+        "players": [
+            [p.user_id, p.username, p.role, p.alive, p.lakap, p.kind.value if p.kind else None]
+            for p in game.players.values()
+        ],
+        "night_actions": {
+            "vampire": list(game.night_actions["vampire"].items()),
+            "doctor": game.night_actions["doctor"],
+            "kurt": game.night_actions["kurt"],
+        },
+        "votes": list(game.votes.items()),
+        "expected_voters": list(game.expected_voters),
+        "vote_message_id": game.vote_message_id,
+        "join_message_id": game.join_message_id,
+        "night_button_messages": list(game.night_button_messages.items()),
+        "timer_kind": game.timer_kind,
+        "epoch": game.epoch,
+        "deadline": game.phase_deadline(),
+    }
+
+def game_from_snapshot(data: Dict[str, Any]) -> GameState:
+    """snapshot_game() çıktısından GameState kur - zamanlayıcılar ayrıca kurulur"""
+    game = GameState()
+    game.group_id = data["group_id"]
+    game.started_by = data["started_by"]
+    game.phase = GamePhase(data["phase"])
+    game.set_active(data["active"])
+    game.load_players([
+        Player(user_id, username, role, alive, lakap, Role(kind) if kind else None)
+        for user_id, username, role, alive, lakap, kind in data["players"]
+    ])
+    actions = data["night_actions"]
+    game.night_actions = {
+        "vampire": dict(actions["vampire"]),
+        "doctor": actions["doctor"],
+        "kurt": actions["kurt"],
+    }
+    game.tally.load(dict(data["votes"]))
+    game.expected_voters = set(data["expected_voters"])
+    game.vote_message_id = data["vote_message_id"]
+    game.join_message_id = data["join_message_id"]
+    game.night_button_messages = dict(data["night_button_messages"])
+    game.timer_kind = data["timer_kind"]
+    game.epoch = data.get("epoch", 0)
+    return game
+
+class SnapshotStore:
+    """SQLite'a toplu ve asenkron yazılan oyun anlık görüntüleri
+    
+    mark() yalnızca grubu kirli işaretler; arka plan görevi her aralıkta kirli
+    oyunların görüntüsünü alır ve tek işlemde ayrı bir thread'de yazar.
+    Oy ve gece aksiyonu işleyicileri diske hiç beklemez.
+    """
+    
+    def __init__(self, path: Optional[str], interval: float = SNAPSHOT_FLUSH_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._dirty: Dict[int, Optional[GameState]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.writes = 0
+    
+    def mark(self, game: GameState):
+        """Oyunu bir sonraki toplu yazıma ekle"""
+        if self.path and game.group_id is not None:
+            self._dirty[game.group_id] = game
+            self._schedule()
+    
+    def discard(self, group_id: Optional[int]):
+        """Grubun kaydını bir sonraki toplu yazımda sil"""
+        if self.path and group_id is not None:
+            self._dirty[group_id] = None
+            self._schedule()
+    
+    def _schedule(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_later())
+    
+    async def _flush_later(self):
+        await asyncio.sleep(self.interval)
+        await self.flush()
+    
+    async def flush(self):
+        """Kirli oyunları hemen yaz"""
+        async with self._lock:
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, {}
+            now = time.time()
+            upserts = []
+            deletes = []
+            for group_id, game in dirty.items():
+                # Bu arada kapatılmış ya da düşürülmüş oyunlar silinir
+                if game is None or games.get(group_id) is not game:
+                    deletes.append((group_id,))
+                else:
+                    upserts.append((group_id, snapshot_game(game), now))
+            try:
+                await asyncio.to_thread(self._write, upserts, deletes)
+            except Exception as e:
+                logger.error("Anlık görüntü yazma hatası: %s", e)
+    
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS games ("
+                "group_id INTEGER PRIMARY KEY, snapshot TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS group_durations ("
+                "group_id INTEGER PRIMARY KEY, durations TEXT NOT NULL)"
+            )
+        return self._conn
+    
+    def _write(self, upserts: List[Tuple[int, Dict[str, Any], float]], deletes: List[Tuple[int]]):
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO games (group_id, snapshot, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(group_id) DO UPDATE SET snapshot = excluded.snapshot, updated_at = excluded.updated_at",
+                [(group_id, json.dumps(data, ensure_ascii=False), at) for group_id, data, at in upserts]
+            )
+            conn.executemany("DELETE FROM games WHERE group_id = ?", deletes)
+        self.writes += 1
+    
+    def load(self) -> List[Dict[str, Any]]:
+        """Kayıtlı tüm anlık görüntüleri oku - bozuk kayıtlar atlanır"""
+        if not self.path or not os.path.exists(self.path):
+            return []
+        snapshots = []
+        for group_id, raw in self._connect().execute("SELECT group_id, snapshot FROM games").fetchall():
+            try:
+                snapshots.append(json.loads(raw))
+            except ValueError as e:
+                logger.error("Grup %s: Bozuk anlık görüntü atlandı: %s", group_id, e, extra={"group_id": group_id})
+        return snapshots
+    
+    async def save_durations(self, group_id: int, durations: Dict[str, int]):
+        """Grubun faz süresi ayarlarını yaz - boş sözlük kaydı siler"""
+        if self.path:
+            async with self._lock:
+                await asyncio.to_thread(self._write_durations, group_id, durations)
+    
+    def _write_durations(self, group_id: int, durations: Dict[str, int]):
+        conn = self._connect()
+        with conn:
+            if durations:
+                conn.execute(
+                    "INSERT INTO group_durations (group_id, durations) VALUES (?, ?) "
+                    "ON CONFLICT(group_id) DO UPDATE SET durations = excluded.durations",
+                    (group_id, json.dumps(durations))
+                )
+            else:
+                conn.execute("DELETE FROM group_durations WHERE group_id = ?", (group_id,))
+    
+    def load_durations(self) -> Dict[int, Dict[str, int]]:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        rows = self._connect().execute("SELECT group_id, durations FROM group_durations").fetchall()
+        return {group_id: json.loads(raw) for group_id, raw in rows}
+    
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+snapshots = SnapshotStore(SNAPSHOT_DB or None)
+
+# === PHASE DURATIONS ===
+
+# Grup başına süre ayarları (sadece varsayılandan farklı olanlar) - GameState'ten
+# ayrı tutulur ki oyunu olmayan gruplar da ayar saklayabilsin
+group_durations: Dict[int, Dict[str, int]] = {}
+
+def default_phase_seconds() -> Dict[str, float]:
+    return {
+        "lobi": JOIN_SECONDS,
+        "gece": NIGHT_SECONDS,
+        "tartisma": DISCUSSION_SECONDS,
+        "oylama": VOTING_SECONDS,
+    }
+
+def phase_seconds(group_id: Optional[int], name: str) -> float:
+    """Grubun faz süresi - ayar yoksa varsayılan"""
+    override = group_durations.get(group_id)
+    if override and name in override:
+        return override[name]
+    return default_phase_seconds()[name]
+
+# === MESSAGE TEMPLATES ===
+
+# Duyuruların sabit kısımları import'ta bir kez kurulur; oyuncu adları her zaman
+# Player.md_name'den (kaçışlı) gelir, listeler tek bir join ile oluşturulur
+
+NIGHT_ROLE_TEMPLATES = {
+    Role.VAMPIR: "🌑 *GECE - VAMPİR SIRA*\n\n🩸 Kimi ısıracaksın?\n⏰ Süreniz: {seconds:g} saniye\n⚠️ Takım arkadaşınızı seçemezsiniz!",
+    Role.DOKTOR: "💉 *GECE - DOKTOR SIRA*\n\n⛑️ Kimi koruyacaksın?\n⏰ Süreniz: {seconds:g} saniye\n⚠️ Takım arkadaşınızı seçemezsiniz!",
+    Role.KURT: "🐺 *GECE - ALFA KURT SIRA*\n\n⚔️ Kimi avlayacaksın?\n🎯 Sadece wampirleri öldürebilirsin!\n⏰ Süreniz: {seconds:g} saniye\n⚠️ Takım arkadaşını seçemezsin!",
+}
+
+ROLE_INFO_TEXT = {
+    Role.DOKTOR: "🩺 *Takımın:* Köylüler\n\n💉 *Gece:* Birini koruyabilirsin!\n⚠️ Takım arkadaşını seçemezsin.",
+    Role.KURT: "🐺 *Takımın:* Köylüler\n\n🐺 *Gece:* Birini avlayabilirsin!\n🎯 Sadece wampirleri öldürebilirsin.",
+    Role.KOYLU: "👨‍🌾 *Takımın:* Köylüler\n\n👨‍🌾 *Gündüz:* Vampirleri bulmaya çalış!\n🗳️ Oylama ile şüpheliyi linç et!",
+}
+VAMPIR_INFO_TEMPLATE = "🧛 *Takım Arkadaşların:* {team}\n\n🌑 *Gece:* Birini ısıracaksın!\n⚠️ Takım arkadaşını seçemezsin."
+
+NIGHT_START_TEMPLATE = (
+    "🌙 *GECE BAŞLADI!*\n\n🧛‍♂️ Vampirler avlanıyor...\n🩺 Doktor hazırlık yapıyor...\n"
+    "{kurt}👻 Köylüler uyuyor...\n\n⏰ *Karar süresi: {seconds:g} saniye*"
+)
+
+NIGHT_WARNINGS = {
+    30: "⚠️ *GECE UYARISI*\n\n⏳ 30 saniye kaldı!\n🧛‍♂️ Vampirler ve 🩺 Doktor hızlı karar versin!",
+    10: "🚨 *GECE SON 10 SANİYE!*\n\n⏰ Karar süreniz bitmek üzere!\nOy kullanmayanlar için otomatik devam edilecek!"
+}
+
+DISCUSSION_WARNINGS = {
+    60: "⏳ *60 SANİYE KALDI!*\n\nTartışmalar kızışıyor... Şüphelerinizi paylaşın!",
+    30: "⚠️ *30 SANİYE KALDI!*\n\nKarar verme zamanı yaklaşıyor! Kim şüpheli?",
+    10: "🚨 *SON 10 SANİYE!*\n\nOylama başlıyor! Hızlıca son sözlerinizi söyleyin!"
+}
+
+NIGHT_SUMMARY_TEMPLATE = "🌅 *Gece Bitti*\n\n🧛‍♂️ Vampirler: {vampire}\n🩺 Doktor: {doctor}\n🐺 Alfa Kurt: {kurt}"
+
+VOTE_HEADER_TEMPLATE = (
+    "🗳️ *OYLAMA BAŞLADI!*\n\n"
+    "⚰️ Kimi linç edeceksiniz?\n"
+    "👆 En çok oy alan idam edilecek!\n\n"
+    "⏰ *Oylama süresi: {seconds:g} saniye*\n"
+    "⚡ Oy kullanmayanlar otomatik geçilecek!"
+)
+
+TIE_TEMPLATE = (
+    "⚖️ *BERABERLİK!*\n\n"
+    "📊 {votes} oy alan {count} kişi:\n"
+    "• {names}\n\n"
+    "🤔 *Köylüler kararsız kaldı ve kimse ölmedi!*\n"
+    "🌙 Gece yaklaşıyor, vampirler için yeni bir şans..."
+)
+
+EXECUTION_TEMPLATE = (
+    "⚰️ *LİNÇ SONUCU*\n\n"
+    "🎯 *İdam Edilen:* [{name}](tg://user?id={user_id})\n"
+    "🎭 *Rolü:* {role}\n"
+    "📊 *Oy Sayısı:* {votes}\n\n"
+    "{distribution}"
+    "\n📈 Toplam {voted}/{total} oy kullanıldı"
+)
+
+NEW_NIGHT_TEXT = (
+    "🌙 *YENİ GECE BAŞLIYOR...*\n\n"
+    "👻 Kötü rüyalar görecek olanlar var!\n"
+    "⏰ Gecenin karanlığında av başlıyor...\n"
+    "⚡ Otomatik devam ediliyor!"
+)
+
+def cached_render(game: GameState, name: str, key: Any, build: Callable[[], str]) -> str:
+    """Aynı anahtarla tekrar çizilen duyuru metnini oyunda sakla"""
+    cache = game.render_cache
+    if cache is None:
+        cache = game.render_cache = {}
+    entry = cache.get(name)
+    if entry is None or entry[0] != key:
+        entry = cache[name] = (key, build())
+    return entry[1]
+
+def persist_game(game: GameState):
+    """Oyun durumu değişti - anlık görüntüyü toplu yazıma bırak"""
+    snapshots.mark(game)
+
+async def restore_games(application) -> int:
+    """Açılışta kayıtlı oyunları geri yükle ve zamanlayıcılarını yeniden kur"""
+    context = CallbackContext(application)
+    restored = 0
+    for data in await asyncio.to_thread(snapshots.load):
+        group_id = data["group_id"]
+        if not owns_group(group_id):
+            continue
+        if not data["active"] or group_id in games:
+            snapshots.discard(group_id)
+            continue
+        game = games[group_id] = game_from_snapshot(data)
+        deadline = data["deadline"]
+        remaining = None if deadline is None else max(0.0, deadline - time.time())
+        resume_game(application, context, game, remaining)
+        restored += 1
+        post_message(context, group_id, "♻️ Bot yeniden başlatıldı! Oyun kaldığı yerden devam ediyor.")
+    if restored:
+        logger.info("♻️ %s oyun anlık görüntüden geri yüklendi", restored)
+    return restored
+
+def resume_game(application, context: ContextTypes.DEFAULT_TYPE, game: GameState, remaining: Optional[float]):
+    """Geri yüklenen oyunun fazına göre zamanlayıcıyı ya da geçişi yeniden başlat"""
+    if game.phase == GamePhase.LOBBY:
+        if remaining is not None:
+            start_join_countdown(context, game, remaining)
+    elif game.phase == GamePhase.NIGHT:
+        start_night_timer(context, game, remaining)
+    elif game.phase == GamePhase.DAY:
+        if game.timer_kind == "voting":
+            start_voting_timer(context, game, remaining)
+        else:
+            start_discussion_timer(context, game, remaining)
+    else:
+        # PLAYING: iki faz arasında kalmış - sonuçlar işlendi, sıradaki faza geç
+        schedule_transition(game, lambda: resume_transition(context, game), "resume")
+
+async def resume_transition(context: ContextTypes.DEFAULT_TYPE, game: GameState):
+    if check_win_condition(game):
+        await end_game(context, game)
+    elif game.timer_kind == "night":
+        await start_day(context, game)
+    else:
+        await start_night(context, game)
+
+def get_game(group_id: int, create: bool = False) -> Optional[GameState]:
+    """Belirli grup için GameState al - sadece create=True ise oluştur"""
+    game = games.get(group_id)
+    if game is None and create:
+        game = games[group_id] = GameState()
+        logger.info("🎮 Yeni oyun instance'ı oluşturuldu: %s", group_id)
+        enforce_game_cap(keep=group_id)
+    elif game is not None:
+        game.last_activity = time.monotonic()
+        games.move_to_end(group_id)
+    return game
+
+def close_game(group_id: int, game: GameState):
+    """Oyunu sıfırla ve grubu games'ten düşür - boştaki gruplar bellek tutmaz"""
+    game.reset()
+    if games.get(group_id) is game:
+        del games[group_id]
+        snapshots.discard(group_id)
+
+# === IDLE GAME EVICTION ===
+eviction_stats = {"evicted_idle": 0, "evicted_lru": 0}
+
+def evict_game(group_id: int, reason: str):
+    """Oyunu düşür - reset() faz/katılma zamanlayıcılarını ve editörü iptal eder"""
+    game = games.pop(group_id)
+    game.reset()
+    snapshots.discard(group_id)
+    eviction_stats[f"evicted_{reason}"] += 1
+    metrics.inc("wampir_games_evicted_total", reason=reason)
+    logger.info("🧹 Oyun düşürüldü (%s): %s", reason, group_id, extra={"group_id": group_id})
+
+def enforce_game_cap(keep: Optional[int] = None):
+    """MAX_LIVE_GAMES aşılırsa en uzun süredir dokunulmayan aktif olmayan kayıtları düşür
+    
+    Aktif oyunlar (oyuncu toplayan lobiler dahil) sınır yüzünden düşürülmez;
+    hepsi aktifse sınır geçici olarak aşılır. keep yeni kurulan kayıttır.
+    """
+    if MAX_LIVE_GAMES <= 0:
+        return
+    excess = len(games) - MAX_LIVE_GAMES
+    if excess <= 0:
+        return
+    victims = [
+        group_id for group_id, game in games.items()
+        if group_id != keep and not game.is_active()
+    ][:excess]
+    for group_id in victims:
+        evict_game(group_id, "lru")
+    if len(victims) < excess:
+        logger.warning("🧹 Oyun sınırı aşıldı: %s canlı oyun (sınır %s), hepsi aktif", len(games), MAX_LIVE_GAMES)
+
+def sweep_idle_games(now: Optional[float] = None) -> int:
+    """GAME_IDLE_TTL'den uzun süredir etkinlik görmeyen oyunları düşür
+
+    games son etkinliğe göre sıralı olduğundan ilk taze oyunda durulur.
+    """
+    now = time.monotonic() if now is None else now
+    evicted = 0
+    while games:
+        group_id, game = next(iter(games.items()))
+        if now - game.last_activity < GAME_IDLE_TTL:
+            break
+        evict_game(group_id, "idle")
+        evicted += 1
+    enforce_game_cap()
+    return evicted
+
+def games_by_phase() -> Dict[LabelKey, float]:
+    """Aktif oyunların faz dağılımı - metrik kazımasında hesaplanır"""
+    counts = {(("phase", phase.value),): 0 for phase in GamePhase}
+    for game in games.values():
+        if game.is_active():
+            counts[(("phase", game.phase.value),)] += 1
+    return counts
+
+metrics.gauge("wampir_games", "Fazlara göre aktif oyunlar", games_by_phase)
+metrics.gauge("wampir_outbound_pending", "Giden kuyrukta bekleyen mesajlar", lambda: {(): outbound.pending()})
+metrics.gauge("wampir_live_games", "Bellekteki oyun kayıtları (aktif olmayanlar dahil)", lambda: {(): len(games)})
+
+def game_stats() -> Dict[str, int]:
+    """Canlı oyun ve düşürme sayaçları"""
+    return {"live_games": len(games), **eviction_stats}
+
+async def eviction_loop():
+    """Boştaki oyunları periyodik olarak temizle"""
+    while True:
+        await asyncio.sleep(EVICTION_INTERVAL)
+        try:
+            if sweep_idle_games():
+                logger.info("🧹 Oyun temizliği: %s", game_stats())
+        except Exception as e:
+            logger.error("Oyun temizliği hatası: %s", e)
 
 async def safe_send_message(
     context: ContextTypes.DEFAULT_TYPE, 
     chat_id: int, 
     text: str, 
     reply_markup: Optional[InlineKeyboardMarkup] = None,
-    parse_mode: str = "Markdown"
+    parse_mode: str = "Markdown",
+    priority: MessagePriority = MessagePriority.NORMAL
 ) -> bool:
     """Safely send message with error handling"""
     try:
-        await context.bot.send_message(
-            chat_id=chat_id, 
-            text=text, 
-            reply_markup=reply_markup, 
-            parse_mode=parse_mode
+        await outbound.submit(
+            chat_id,
+            functools.partial(
+                context.bot.send_message,
+                chat_id=chat_id, 
+                text=text, 
+                reply_markup=reply_markup, 
+                parse_mode=parse_mode
+            ),
+            priority
         )
+        metrics.inc("wampir_messages_total", helper="safe_send_message", result="sent")
         return True
     except Exception as e:
-        logger.error(f"Message send error to {chat_id}: {e}")
+        metrics.inc("wampir_messages_total", helper="safe_send_message", result="failed")
+        logger.error("Message send error to %s: %s", chat_id, e)
         return False
 
+def track_posted(future: asyncio.Future, helper: str, chat_id: int):
+    """Beklenmeyen gönderimin sonucunu metriklere ve loga yaz"""
+    def done(future: asyncio.Future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            metrics.inc("wampir_messages_total", helper=helper, result="sent")
+        else:
+            metrics.inc("wampir_messages_total", helper=helper, result="failed")
+            logger.error("Message post error to %s: %s", chat_id, error)
+    future.add_done_callback(done)
+
+def post_message(
+    context: ContextTypes.DEFAULT_TYPE,
+    chat_id: int,
+    text: str,
+    reply_markup: Optional[InlineKeyboardMarkup] = None,
+    parse_mode: str = "Markdown",
+    priority: MessagePriority = MessagePriority.FLAVOUR
+):
+    """Mesajı kuyruğa al ve bekleme - handler'lar sohbetin hız sınırında takılmaz"""
+    future = outbound.post(
+        chat_id,
+        functools.partial(
+            context.bot.send_message,
+            chat_id=chat_id,
+            text=text,
+            reply_markup=reply_markup,
+            parse_mode=parse_mode
+        ),
+        priority
+    )
+    track_posted(future, "post_message", chat_id)
+
 async def safe_send_photo(
     context: ContextTypes.DEFAULT_TYPE,
     chat_id: int,
-    photo_url: str,
+    image_key: str,
     caption: str = "",
-    parse_mode: str = "Markdown"
+    parse_mode: str = "Markdown",
+    priority: MessagePriority = MessagePriority.CRITICAL
 ) -> bool:
-    """Güvenli fotoğraf gönder"""
-    try:
-        await context.bot.send_photo(
-            chat_id=chat_id,
-            photo=photo_url,
-            caption=caption,
-            parse_mode=parse_mode
-        )
-        return True
-    except Exception as e:
-        logger.error(f"Photo send error to {chat_id}: {e}")
-        # Fallback: normal mesaj gönder
-        await safe_send_message(context, chat_id, caption, parse_mode=parse_mode)
-        return False
+    """Güvenli fotoğraf gönder - önbellekteki file_id varsa URL yerine onu kullan"""
+    file_id = media_cache.get(image_key)
+    
+    for photo in ([file_id] if file_id else []) + [IMAGES[image_key]]:
+        try:
+            message = await outbound.submit(
+                chat_id,
+                functools.partial(
+                    context.bot.send_photo,
+                    chat_id=chat_id,
+                    photo=photo,
+                    caption=caption,
+                    parse_mode=parse_mode
+                ),
+                priority
+            )
+            if photo != file_id:
+                media_cache.remember(image_key, message)
+            metrics.inc("wampir_messages_total", helper="safe_send_photo", result="sent")
+            return True
+        except Exception as e:
+            metrics.inc("wampir_messages_total", helper="safe_send_photo", result="failed")
+            logger.error("Photo send error to %s: %s", chat_id, e)
+            if photo == file_id:
+                # file_id geçersiz olmuş olabilir - URL ile tekrar dene
+                media_cache.forget(image_key)
+    
+    # Fallback: normal mesaj gönder
+    await safe_send_message(context, chat_id, caption, parse_mode=parse_mode, priority=priority)
+    return False
 
 async def safe_send_pm(
     user_id: int, 
     text: str, 
-    reply_markup: Optional[InlineKeyboardMarkup] = None
+    reply_markup: Optional[InlineKeyboardMarkup] = None,
+    priority: MessagePriority = MessagePriority.NORMAL
 ) -> bool:
     """Safely send private message"""
     global app
     if app is None:
         return False
     try:
-        await app.bot.send_message(
-            chat_id=user_id, 
-            text=text, 
-            reply_markup=reply_markup,
-            parse_mode="Markdown"
+        await outbound.submit(
+            user_id,
+            functools.partial(
+                app.bot.send_message,
+                chat_id=user_id, 
+                text=text, 
+                reply_markup=reply_markup,
+                parse_mode="Markdown"
+            ),
+            priority
         )
+        metrics.inc("wampir_messages_total", helper="safe_send_pm", result="sent")
         return True
     except Exception as e:
-        logger.error(f"PM send error to {user_id}: {e}")
+        metrics.inc("wampir_messages_total", helper="safe_send_pm", result="failed")
+        logger.error("PM send error to %s: %s", user_id, e, extra={"user_id": user_id})
         return False
 
+def post_pm(
+    user_id: int,
+    text: str,
+    reply_markup: Optional[InlineKeyboardMarkup] = None,
+    priority: MessagePriority = MessagePriority.NORMAL
+):
+    """Özel mesajı kuyruğa al ve bekleme"""
+    if app is None:
+        return
+    future = outbound.post(
+        user_id,
+        functools.partial(
+            app.bot.send_message,
+            chat_id=user_id,
+            text=text,
+            reply_markup=reply_markup,
+            parse_mode="Markdown"
+        ),
+        priority
+    )
+    track_posted(future, "post_pm", user_id)
+
+async def fan_out(
+    jobs: List[Awaitable[Any]],
+    concurrency: int = PM_FANOUT_CONCURRENCY,
+    label: str = "fan-out"
+) -> List[Any]:
+    """Gönderimleri sınırlı eşzamanlılıkla paralel çalıştır - sonuç sırası korunur"""
+    if not jobs:
+        return []
+    
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    
+    async def run(job: Awaitable[Any]) -> Any:
+        async with semaphore:
+            return await job
+    
+    started = time.monotonic()
+    results = await asyncio.gather(*(run(job) for job in jobs))
+    elapsed_ms = (time.monotonic() - started) * 1000
+    
+    logger.info("📨 %s: %s gönderim %.0f ms içinde tamamlandı (eşzamanlılık: %s)", label, len(jobs), elapsed_ms, concurrency)
+    return list(results)
+
+async def fan_out_pms(
+    messages: List[Tuple[int, str, Optional[InlineKeyboardMarkup]]],
+    concurrency: int = PM_FANOUT_CONCURRENCY,
+    label: str = "PM",
+    priority: MessagePriority = MessagePriority.NORMAL
+) -> List[bool]:
+    """Özel mesajları paralel gönder - her mesaj için başarı durumu döner"""
+    return await fan_out(
+        [safe_send_pm(user_id, text, reply_markup, priority) for user_id, text, reply_markup in messages],
+        concurrency=concurrency,
+        label=label
+    )
+
 async def send_mention(
     context: ContextTypes.DEFAULT_TYPE, 
     chat_id: int, 
     user_id: int, 
-    text: str
+    text: str,
+    priority: MessagePriority = MessagePriority.NORMAL
 ) -> bool:
     """Send message with user mention"""
     try:
-        game = get_game(chat_id)
-        player_name = next(
-            (p.username for p in game.players.values() if p.user_id == user_id), 
-            "Bilinmeyen"
-        )
-        mention = f"[{player_name}](tg://user?id={user_id})"
         await safe_send_message(
-            context, chat_id, f"{mention} {text}", parse_mode="Markdown"
+            context, chat_id, f"{mention_md(chat_id, user_id)} {text}", parse_mode="Markdown", priority=priority
         )
         return True
     except Exception as e:
-        logger.error(f"Mention error: {e}")
+        logger.error("Mention error: %s", e)
         return False
 
+def mention_md(chat_id: int, user_id: int) -> str:
+    """Oyuncunun Markdown mention'ı - oyunda değilse Bilinmeyen"""
+    game = get_game(chat_id)
+    player = game.players.get(user_id) if game else None
+    player_name = player.md_name if player else "Bilinmeyen"
+    return f"[{player_name}](tg://user?id={user_id})"
+
+# Hedef butonlarının callback_data'sı: önek + base64(grup, hedef, tur, faz)
+# 64 baytlık sınırın çok altında kalır ve split/int() gerektirmez
+TARGET_PREFIX = "~"
+_TARGET_STRUCT = struct.Struct(">qqIB")
+_PHASE_CODES = {"night": 0, "day": 1}
+_PHASE_NAMES = {code: name for name, code in _PHASE_CODES.items()}
+
+def encode_target(group_id: int, target_id: int, epoch: int, phase: str) -> str:
+    packed = _TARGET_STRUCT.pack(group_id, target_id, epoch & 0xFFFFFFFF, _PHASE_CODES[phase])
+    return TARGET_PREFIX + base64.urlsafe_b64encode(packed).decode("ascii")
+
+def decode_target(data: str) -> Optional[Tuple[int, int, int, str]]:
+    """(grup, hedef, tur, faz) - bozuk veri için None"""
+    try:
+        packed = base64.urlsafe_b64decode(data[len(TARGET_PREFIX):])
+        group_id, target_id, epoch, phase_code = _TARGET_STRUCT.unpack(packed)
+    except (ValueError, struct.error):
+        return None
+    phase = _PHASE_NAMES.get(phase_code)
+    if phase is None:
+        return None
+    return group_id, target_id, epoch, phase
+
 def build_player_buttons(game: GameState, only_alive: bool = True, group_id: int = None, phase: str = "night") -> Optional[InlineKeyboardMarkup]:
-    """Build inline keyboard with player buttons"""
+    """Build inline keyboard with player buttons
+    
+    Canlı oyuncu klavyesi (canlı küme sürümü, faz, tur) başına bir kez kurulur;
+    gecenin tüm rol PM'leri ve oylama mesajı düzenlemeleri aynı nesneyi kullanır.
+    """
     if not game.players:
         return None
     
+    if only_alive:
+        key = (game.alive_version, phase, game.epoch)
+        if game.keyboard_cache and game.keyboard_cache[0] == key and group_id == game.group_id:
+            return game.keyboard_cache[1]
+    
     buttons = []
     player_list = game.get_alive_players() if only_alive else list(game.players.values())
     
@@ -320,7 +2229,7 @@ def build_player_buttons(game: GameState, only_alive: bool = True, group_id: int
             
         button = InlineKeyboardButton(
             f"{player.username} {'💀' if not player.alive else ''}", 
-            callback_data=f"target_{group_id}_{player.user_id}_{phase}"
+            callback_data=encode_target(group_id, player.user_id, game.epoch, phase)
         )
         row.append(button)
         
@@ -331,57 +2240,90 @@ def build_player_buttons(game: GameState, only_alive: bool = True, group_id: int
     if row:
         buttons.append(row)
     
-    return InlineKeyboardMarkup(buttons) if buttons else None
+    if not buttons:
+        return None
+    markup = InlineKeyboardMarkup(buttons)
+    if only_alive and group_id == game.group_id:
+        game.keyboard_cache = (key, markup)
+    return markup
 
 def build_join_button() -> InlineKeyboardMarkup:
     """Oyuna katıl butonu oluştur"""
     button = InlineKeyboardButton("🎮 Oyuna Katıl", callback_data="join_game")
     return InlineKeyboardMarkup([[button]])
 
-async def update_join_message(context: ContextTypes.DEFAULT_TYPE, game: GameState):
-    """Katılma mesajını güncelle - CANLI/ÖLÜ DURUM"""
-    if not game.join_message_id:
-        return
+def render_join_message(game: GameState) -> str:
+    """Katılma mesajı metni - CANLI/ÖLÜ DURUM"""
+    in_lobby = game.phase == GamePhase.LOBBY
+    player_list = cached_render(
+        game, "join", (game.alive_version, in_lobby),
+        lambda: render_join_players(game, in_lobby)
+    )
     
-    try:
-        player_list = "🎮 *Katılan Oyuncular:*\n"
-        
-        if not game.players:
-            player_list += "Henüz kimse katılmadı...\n"
-        else:
-            for i, player in enumerate(game.players.values(), 1):
-                if game.phase == GamePhase.LOBBY:
-                    status = "❤️ Canlı"
-                    emoji = "❤️"
-                else:
-                    status = "❤️ Canlı" if player.alive else "💀 Ölü"
-                    emoji = "❤️" if player.alive else "💀"
-                
-                player_list += f"{i}. {player.username} {emoji} {status}\n"
-        
-        player_count = len(game.players)
-        min_players = 5
-        remaining = max(0, min_players - player_count)
-        
-        info_text = f"\n📊 *Durum:* {player_count}/{min_players} kişi"
-        
-        if remaining > 0:
-            info_text += f" ({remaining} kişi daha gerekli)"
-        else:
-            info_text += " ✅ (Minimum tamamlandı!)"
+    player_count = len(game.players)
+    min_players = 5
+    remaining = max(0, min_players - player_count)
+    
+    info_text = f"\n📊 *Durum:* {player_count}/{min_players} kişi"
+    
+    if remaining > 0:
+        info_text += f" ({remaining} kişi daha gerekli)"
+    else:
+        info_text += " ✅ (Minimum tamamlandı!)"
+    
+    return player_list + info_text
+
+def render_join_players(game: GameState, in_lobby: bool) -> str:
+    if not game.players:
+        return "🎮 *Katılan Oyuncular:*\nHenüz kimse katılmadı...\n"
+    return "🎮 *Katılan Oyuncular:*\n" + "".join([
+        f"{i}. {player.md_name} ❤️ ❤️ Canlı\n" if in_lobby or player.alive
+        else f"{i}. {player.md_name} 💀 💀 Ölü\n"
+        for i, player in enumerate(game.players.values(), 1)
+    ])
+
+def get_join_editor(context: ContextTypes.DEFAULT_TYPE, game: GameState) -> 'CoalescedEditor':
+    """Oyunun katılma mesajı düzenleyicisini al - yoksa oluştur"""
+    if game.join_editor is None:
+        group_id = game.group_id
         
-        full_text = player_list + info_text
+        def render():
+            if not game.join_message_id or game.group_id != group_id:
+                return None
+            return render_join_message(game), build_join_button()
         
-        await context.bot.edit_message_text(
-            chat_id=game.group_id,
-            message_id=game.join_message_id,
-            text=full_text,
-            reply_markup=build_join_button(),
-            parse_mode="Markdown"
-        )
+        async def send(text: str, reply_markup: Optional[InlineKeyboardMarkup]) -> bool:
+            try:
+                await outbound.submit(
+                    group_id,
+                    functools.partial(
+                        context.bot.edit_message_text,
+                        chat_id=group_id,
+                        message_id=game.join_message_id,
+                        text=text,
+                        reply_markup=reply_markup,
+                        parse_mode="Markdown"
+                    )
+                )
+            except Exception as e:
+                logger.error("Katılma mesajı güncelleme hatası: %s", e)
+                return False
+            return True
         
-    except Exception as e:
-        logger.error(f"Katılma mesajı güncelleme hatası: {e}")
+        game.join_editor = CoalescedEditor(render, send, JOIN_EDIT_DEBOUNCE)
+    return game.join_editor
+
+async def update_join_message(context: ContextTypes.DEFAULT_TYPE, game: GameState):
+    """Katılma mesajını güncelle - kısa pencerede gelen katılımlar tek düzenlemede birleşir"""
+    if not game.join_message_id:
+        return
+    get_join_editor(context, game).touch()
+
+async def flush_join_message(context: ContextTypes.DEFAULT_TYPE, game: GameState):
+    """Bekleyen katılma mesajı düzenlemesini hemen gönder"""
+    if not game.join_message_id:
+        return
+    await get_join_editor(context, game).flush()
 
 async def pin_join_message(context: ContextTypes.DEFAULT_TYPE, game: GameState):
     """Katılma mesajını sabitle - BUTONLU"""
@@ -390,45 +2332,111 @@ async def pin_join_message(context: ContextTypes.DEFAULT_TYPE, game: GameState):
             "🧛‍♂️ *Vampir Köylü Oyunu Başladı!*\n\n"
             "👥 Aşağıdaki butona tıklayarak oyuna katılın!\n"
             "⚡ En az 5 kişi gerekiyor.\n"
-            "⏰ 5. oyuncudan sonra 1 dakika bekleme süresi başlar.\n\n"
+            f"⏰ 5. oyuncudan sonra {phase_seconds(game.group_id, 'lobi'):g} saniye bekleme süresi başlar.\n\n"
             "🎮 *Katılan Oyuncular:*\n"
             "Henüz kimse katılmadı..."
         )
         
-        message = await context.bot.send_message(
-            chat_id=game.group_id,
-            text=join_text,
-            reply_markup=build_join_button(),
-            parse_mode="Markdown"
+        message = await outbound.submit(
+            game.group_id,
+            functools.partial(
+                context.bot.send_message,
+                chat_id=game.group_id,
+                text=join_text,
+                reply_markup=build_join_button(),
+                parse_mode="Markdown"
+            ),
+            MessagePriority.CRITICAL
         )
         
-        await context.bot.pin_chat_message(
-            chat_id=game.group_id,
-            message_id=message.message_id
+        await outbound.submit(
+            game.group_id,
+            functools.partial(
+                context.bot.pin_chat_message,
+                chat_id=game.group_id,
+                message_id=message.message_id
+            ),
+            MessagePriority.CRITICAL
         )
-        game.join_message_id = message.message_id
-        logger.info(f"Grup {game.group_id}: Butonlu katılma mesajı sabitlendi")
+        async with group_locks.hold(game.group_id):
+            game.join_message_id = message.message_id
+        logger.info("Grup %s: Butonlu katılma mesajı sabitlendi", game.group_id, extra=game_log(game))
         
     except Exception as e:
-        logger.error(f"Mesaj sabitleme hatası: {e}")
+        logger.error("Mesaj sabitleme hatası: %s", e)
+
+async def send_night_buttons(
+    game: GameState,
+    player: Player,
+    text: str,
+    reply_markup: Optional[InlineKeyboardMarkup]
+) -> Optional[int]:
+    """Oyuncuya gece butonlarını gönder - mesaj ID'si döner"""
+    try:
+        message = await outbound.submit(
+            player.user_id,
+            functools.partial(
+                app.bot.send_message,
+                chat_id=player.user_id,
+                text=text,
+                reply_markup=reply_markup,
+                parse_mode="Markdown"
+            ),
+            MessagePriority.CRITICAL
+        )
+        logger.info("Grup %s: %s için GECE butonları açıldı", game.group_id, player.username, extra=game_log(game, player.user_id))
+        return message.message_id
+    except Exception as e:
+        logger.error("Grup %s: %s gece buton hatası: %s", game.group_id, player.username, e, extra=game_log(game, player.user_id))
+        return None
+
+NIGHT_BUTTONS_CLOSED_TEXT = (
+    "🔒 *Gece Oylaması Kapandı!*\n\n"
+    "⏰ Gece oylama süresi doldu.\n"
+    "📊 Sonuçlar açıklanıyor...\n"
+    "🌅 Gündüz hazırlıkları başlıyor!"
+)
+NIGHT_BUTTONS_CANCELLED_TEXT = "🛑 *Oyun iptal edildi!*\n\n🔒 Gece butonları kapatıldı."
+
+async def close_night_button_message(user_id: int, message_id: int, text: str = NIGHT_BUTTONS_CLOSED_TEXT) -> bool:
+    """Gece buton mesajını kapanış notuna çevir ve butonları kaldır"""
+    try:
+        await outbound.submit(
+            user_id,
+            functools.partial(
+                app.bot.edit_message_text,
+                chat_id=user_id,
+                message_id=message_id,
+                text=text,
+                reply_markup=None,
+                parse_mode="Markdown"
+            )
+        )
+        return True
+    except Exception as e:
+        logger.error("Gece buton kapatma hatası %s: %s", user_id, e, extra={"user_id": user_id})
+        return False
+
+async def close_night_buttons(
+    group_id: int,
+    button_messages: List[Tuple[int, int]],
+    text: str = NIGHT_BUTTONS_CLOSED_TEXT
+):
+    """Kayıtlı gece buton mesajlarını (user_id, message_id) kapat"""
+    if app is not None and button_messages:
+        await fan_out(
+            [close_night_button_message(user_id, message_id, text) for user_id, message_id in button_messages],
+            label=f"Grup {group_id} gece butonu kapatma"
+        )
 
 async def clear_night_buttons(game: GameState):
-    """Sadece gece butonlarını temizle"""
-    for player in game.get_alive_players():
-        if player.user_id in game.night_button_messages:
-            try:
-                await safe_send_pm(
-                    player.user_id,
-                    "🔒 *Gece Oylaması Kapandı!*\n\n"
-                    "⏰ Gece oylama süresi doldu.\n"
-                    "📊 Sonuçlar açıklanıyor...\n"
-                    "🌅 Gündüz hazırlıkları başlıyor!"
-                )
-            except Exception as e:
-                logger.error(f"Gece buton uyarısı hatası {player.username}: {e}")
-    
+    """Sadece gece butonlarını temizle - yalnızca buton alan oyuncuların mesajları düzenlenir"""
+    button_messages = list(game.night_button_messages.items())
     game.night_button_messages.clear()
-    logger.info(f"Grup {game.group_id}: 🌙 Gece butonları temizlendi")
+    
+    await close_night_buttons(game.group_id, button_messages)
+    
+    logger.info("Grup %s: 🌙 Gece butonları temizlendi", game.group_id, extra=game_log(game))
 
 # === COMMAND HANDLERS ===
 
@@ -458,28 +2466,29 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def wstart(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Start new game - BUTONLU KATILMA"""
-    async with state_lock:
-        chat = update.effective_chat
-        group_id = chat.id
-        
-        if chat.type not in ["group", "supergroup"]:
-            await update.message.reply_text("❌ Bu komut sadece grupta kullanılabilir!")
-            return
-        
-        game = get_game(group_id)
-        
-        if game.is_active():
-            await update.message.reply_text("❌ Bu grupta zaten bir oyun devam ediyor!")
-            return
-        
-        game.reset()
-        game.group_id = group_id
-        game.started_by = update.effective_user.id
-        game.set_active(True)
-        game.phase = GamePhase.LOBBY
-        
-        await pin_join_message(context, game)
-        logger.info(f"🎮 Grup {group_id}: Oyun başlatıldı")
+    chat = update.effective_chat
+    group_id = chat.id
+    
+    if chat.type not in ["group", "supergroup"]:
+        await update.message.reply_text("❌ Bu komut sadece grupta kullanılabilir!")
+        return
+    
+    async with group_locks.hold(group_id):
+        game = get_game(group_id, create=True)
+        already_active = game.is_active()
+        if not already_active:
+            game.reset()
+            game.group_id = group_id
+            game.started_by = update.effective_user.id
+            game.set_active(True)
+            persist_game(game)
+    
+    if already_active:
+        await update.message.reply_text("❌ Bu grupta zaten bir oyun devam ediyor!")
+        return
+    
+    await pin_join_message(context, game)
+    logger.info("🎮 Grup %s: Oyun başlatıldı", group_id, extra=game_log(game, game.started_by))
 
 async def wjoin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Join game lobby"""
@@ -490,13 +2499,17 @@ async def wjoin(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     group_id = update.effective_chat.id
-    game = get_game(group_id)
     
-    if game.phase != GamePhase.LOBBY or not game.is_active():
+    async with group_locks.hold(group_id):
+        game = get_game(group_id)
+        in_lobby = game is not None and game.phase == GamePhase.LOBBY and game.is_active()
+        added = in_lobby and game.add_player(user.id, user.first_name or user.username or "Bilinmeyen")
+    
+    if not in_lobby:
         await update.message.reply_text("⚠️ Bu grupta oyun başladı veya bitti! Katılamazsınız.")
         return
     
-    if not game.add_player(user.id, user.first_name or user.username or "Bilinmeyen"):
+    if not added:
         await update.message.reply_text("❌ Zaten bu oyundasınız!")
         return
     
@@ -507,49 +2520,90 @@ async def wjoin(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 InlineKeyboardButton("🤖 Bota Git", url="https://t.me/Wwampir_bot")
             ]])
         )
-        if user.id in game.players:
-            del game.players[user.id]
+        async with group_locks.hold(group_id):
+            game.remove_player(user.id)
+            persist_game(game)
         return
     
-    await send_mention(context, group_id, user.id, "oyuna katıldı! 🎉")
+    post_message(context, group_id, f"{mention_md(group_id, user.id)} oyuna katıldı! 🎉", priority=MessagePriority.NORMAL)
     await update_join_message(context, game)
     
-    player_count = len(game.players)
-    logger.info(f"👥 Grup {group_id}: Oyuncu katıldı: {player_count} kişi")
+    async with group_locks.hold(group_id):
+        player_count = len(game.players)
+        countdown = update_join_countdown(context, game)
+        persist_game(game)
     
-    if player_count == 5:
-        if game._join_timer_task and not game._join_timer_task.done():
-            game._join_timer_task.cancel()
-        
-        game.join_time_left = 60
-        game._join_timer_task = asyncio.create_task(join_countdown(context, game))
-        
-        await safe_send_message(
-            context, group_id,
-            "🎉 5 kişi tamamlandı!\n⏳ 1 dakika içinde başka oyuncu katılmazsa oyun başlayacak."
+    logger.info("👥 Grup %s: Oyuncu katıldı: %s kişi", group_id, player_count, extra=game_log(game, user.id))
+    announce_join_countdown(context, game, countdown, player_count)
+
+def update_join_countdown(context: ContextTypes.DEFAULT_TYPE, game: GameState) -> Optional[str]:
+    """5 kişiye ulaşıldığında sayacı başlat, sonrakilerde sıfırla - grup kilidi altında çağrılır
+    
+    Ekleme ile bu çağrı arasında kilit bırakılabildiği için (/wjoin PM'i bekler)
+    eşzamanlı katılımlar 5'i atlayabilir; sayaç tam sayıya değil, kurulu olup
+    olmadığına bakar.
+    """
+    player_count = len(game.players)
+    if player_count < 5:
+        return None
+    if game._join_timer is None:
+        start_join_countdown(context, game)
+        return "started"
+    if not game._join_timer.done():
+        game._join_timer.reset(phase_seconds(game.group_id, "lobi"))
+        return "reset"
+    return None
+
+def announce_join_countdown(
+    context: ContextTypes.DEFAULT_TYPE,
+    game: GameState,
+    countdown: Optional[str],
+    player_count: int
+):
+    """Sayaç değişikliğini gruba duyur - kuyruğa alınır, beklenmez"""
+    if countdown == "started":
+        post_message(
+            context, game.group_id,
+            f"🎉 5 kişi tamamlandı!\n⏳ {phase_seconds(game.group_id, 'lobi'):g} saniye içinde başka oyuncu katılmazsa oyun başlayacak.",
+            priority=MessagePriority.NORMAL
         )
-    elif player_count > 5 and game._join_timer_task and not game._join_timer_task.done():
-        game.join_time_left = 60
-        await safe_send_message(
-            context, group_id,
-            f"➕ Yeni oyuncu! Süre 60 saniyeye sıfırlandı.\n👥 Toplam: {player_count} oyuncu"
+    elif countdown == "reset":
+        post_message(
+            context, game.group_id,
+            f"➕ Yeni oyuncu! Süre {phase_seconds(game.group_id, 'lobi'):g} saniyeye sıfırlandı.\n👥 Toplam: {player_count} oyuncu",
+            priority=MessagePriority.NORMAL
         )
 
-async def join_countdown(context: ContextTypes.DEFAULT_TYPE, game: GameState):
-    """Countdown for lobby phase"""
+def start_join_countdown(context: ContextTypes.DEFAULT_TYPE, game: GameState, duration: Optional[float] = None):
+    """Countdown for lobby phase - 30s uyarısı ve bitiş son tarih olarak kurulur"""
+    duration = phase_seconds(game.group_id, "lobi") if duration is None else duration
     group_id = game.group_id
-    while game.join_time_left > 0 and game.phase == GamePhase.LOBBY:
-        await asyncio.sleep(1)
-        game.join_time_left -= 1
-        
-        if game.join_time_left == 30:
+    if game._join_timer:
+        game._join_timer.cancel()
+    
+    async def warn_30():
+        if game.phase == GamePhase.LOBBY:
             await safe_send_message(context, group_id, "⚠️ 30 saniye kaldı! Katılacak yeni oyuncu yoksa oyun başlayacak.")
     
-    if len(game.players) >= 5 and game.phase == GamePhase.LOBBY:
+    game._join_timer = PhaseTimer(
+        duration,
+        on_expire=transition_on_expire(game, lambda: join_countdown_expired(context, game), "lobby"),
+        warnings={30: warn_30}
+    )
+
+async def join_countdown_expired(context: ContextTypes.DEFAULT_TYPE, game: GameState):
+    """Lobi süresi doldu"""
+    group_id = game.group_id
+    if game.phase != GamePhase.LOBBY:
+        return
+    
+    if len(game.players) >= 5:
         await start_game(context, game)
     else:
         await safe_send_message(context, group_id, "❌ Yeterli oyuncu yok! Oyun iptal edildi.")
-        game.reset()
+        async with group_locks.hold(group_id):
+            if game.phase == GamePhase.LOBBY:
+                close_game(group_id, game)
 
 async def wson(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Stop/cancel game"""
@@ -560,58 +2614,147 @@ async def wson(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     group_id = update.effective_chat.id
-    game = get_game(group_id)
     
-    if game.started_by != user_id:
+    async with group_locks.hold(group_id):
+        game = get_game(group_id)
+        allowed = game is not None and game.started_by == user_id
+        if allowed:
+            # reset() kaydı siler; açık kalan gece butonları iptalden sonra kapatılır
+            night_buttons = list(game.night_button_messages.items())
+            close_game(group_id, game)
+    
+    if not allowed:
         await update.message.reply_text("❌ Sadece oyunu başlatan kişi oyunu iptal edebilir!")
         return
     
-    game.reset()
     await update.message.reply_text("🛑 Oyun iptal edildi!")
-    logger.info(f"Grup {group_id}: Oyun iptal edildi")
+    logger.info("Grup %s: Oyun iptal edildi", group_id, extra={"group_id": group_id, "user_id": user_id})
+    await close_night_buttons(group_id, night_buttons, NIGHT_BUTTONS_CANCELLED_TEXT)
 
-async def wyardim(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show help message"""
-    help_text = (
+async def wsure(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Grubun faz sürelerini göster veya ayarla - ayar sadece yöneticiler"""
+    chat = update.effective_chat
+    
+    if chat.type not in ["group", "supergroup"]:
+        await update.message.reply_text("❌ Bu komut sadece grupta kullanılabilir!")
+        return
+    
+    args = context.args or []
+    if not args:
+        lines = [f"• {name}: {phase_seconds(chat.id, name):g} saniye" for name in default_phase_seconds()]
+        await update.message.reply_text(
+            "⏱️ *Faz Süreleri:*\n" + "\n".join(lines) +
+            "\n\nDeğiştirmek için: `/wsure gece 45`\nSıfırlamak için: `/wsure varsayilan`",
+            parse_mode="Markdown"
+        )
+        return
+    
+    member = await context.bot.get_chat_member(chat.id, update.effective_user.id)
+    if member.status not in ["administrator", "creator"]:
+        await update.message.reply_text("❌ Sadece grup yöneticileri süreleri değiştirebilir!")
+        return
+    
+    if args[0] == "varsayilan":
+        group_durations.pop(chat.id, None)
+        await snapshots.save_durations(chat.id, {})
+        await update.message.reply_text("✅ Faz süreleri varsayılana döndü!")
+        return
+    
+    name = args[0]
+    if len(args) != 2 or name not in default_phase_seconds() or not args[1].isdigit():
+        await update.message.reply_text(
+            "❌ Kullanım: `/wsure <lobi|gece|tartisma|oylama> <saniye>`",
+            parse_mode="Markdown"
+        )
+        return
+    
+    seconds = int(args[1])
+    if not PHASE_SECONDS_MIN <= seconds <= PHASE_SECONDS_MAX:
+        await update.message.reply_text(f"❌ Süre {PHASE_SECONDS_MIN}-{PHASE_SECONDS_MAX} saniye arasında olmalı!")
+        return
+    
+    durations = group_durations.setdefault(chat.id, {})
+    durations[name] = seconds
+    await snapshots.save_durations(chat.id, durations)
+    await update.message.reply_text(f"✅ {name} süresi {seconds} saniye olarak ayarlandı! Sonraki fazlardan itibaren geçerli.")
+    logger.info("⏱️ Grup %s: %s süresi %s sn", chat.id, name, seconds, extra={"group_id": chat.id})
+
+async def wtrace(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """En yavaş callback izleri - sadece TRACE_ADMIN_IDS
+    
+    /wtrace - özet, /wtrace gecis - faz geçişleri, /wtrace dosya - dosyalara yaz,
+    /wtrace sifirla - temizle
+    """
+    if update.effective_user.id not in TRACE_ADMIN_IDS:
+        await update.message.reply_text("❌ Bu komut sadece bot yöneticileri içindir!")
+        return
+    
+    action = context.args[0].lower() if context.args else ""
+    if action == "dosya":
+        try:
+            count = await asyncio.to_thread(tracer.dump, TRACE_DUMP_FILE)
+            transitions = await asyncio.to_thread(transition_tracer.dump, TRACE_TRANSITION_DUMP_FILE)
+        except OSError as e:
+            await update.message.reply_text(f"❌ İz dosyası yazılamadı: {e}")
+            return
+        await update.message.reply_text(
+            f"💾 {count} iz {TRACE_DUMP_FILE}, {transitions} geçiş izi {TRACE_TRANSITION_DUMP_FILE} dosyasına yazıldı."
+        )
+    elif action == "gecis":
+        await update.message.reply_text(transition_tracer.render(), parse_mode="Markdown")
+    elif action == "sifirla":
+        tracer.clear()
+        transition_tracer.clear()
+        await update.message.reply_text("🧹 İzler temizlendi.")
+    else:
+        await update.message.reply_text(tracer.render(), parse_mode="Markdown")
+
+def render_help(chat_id: Optional[int]) -> str:
+    """Komut yardımı - faz süreleri sohbetin ayarlarından"""
+    return (
         "🧛‍♂️ *Vampir Köylü - Komutlar*\n\n"
         "🎮 **Oyun Yönetimi:**\n"
         "• `/wstart` - Oyunu başlatır (sadece grupta)\n"
         "• `/wjoin` - Oyuna katılır\n"
-        "• `/wson` - Oyunu iptal eder (sadece başlatan)\n\n"
+        "• `/wson` - Oyunu iptal eder (sadece başlatan)\n"
+        "• `/wsure` - Faz sürelerini gösterir/ayarlar (yöneticiler)\n\n"
         
         "📋 **Bilgi:**\n"
         "• `/wnasiloynanir` - Oyun kuralları\n\n"
         
         "⚙️ **Oyun Özellikleri:**\n"
         "• En az 5 oyuncu gerekir\n"
-        "• 5. oyuncudan sonra 60 saniye bekleme\n"
-        "• Gece: 60 saniye aksiyon süresi\n"
-        "• Gündüz: 90 saniye tartışma + 30 saniye oylama\n"
+        f"• 5. oyuncudan sonra {phase_seconds(chat_id, 'lobi'):g} saniye bekleme\n"
+        f"• Gece: {phase_seconds(chat_id, 'gece'):g} saniye aksiyon süresi\n"
+        f"• Gündüz: {phase_seconds(chat_id, 'tartisma'):g} saniye tartışma + {phase_seconds(chat_id, 'oylama'):g} saniye oylama\n"
         "• Inline butonlarla oylama\n"
         "• Her grupta ayrı oyun!\n\n"
         "❓ Sorularınız için oyunu başlatan kişiye yazın!"
     )
-    
-    await update.message.reply_text(help_text, parse_mode="Markdown")
 
-async def wnasıloynanır(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show game rules"""
-    rules_text = (
+async def wyardim(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show help message"""
+    await update.message.reply_text(render_help(update.effective_chat.id), parse_mode="Markdown")
+
+def render_rules(chat_id: Optional[int]) -> str:
+    """Oyun kuralları - faz süreleri sohbetin ayarlarından"""
+    night = phase_seconds(chat_id, 'gece')
+    return (
         "🧛‍♂️ *Vampir Köylü - Kurallar*\n\n"
         
         "👥 **Oyuncular:**\n"
         "• En az 5 kişi\n"
         "• Roller: Vampir(1+), Doktor(1), Köylü(geri kalan)\n\n"
         
-        "🌙 **Gece Aşaması (60s):**:\n"
+        f"🌙 **Gece Aşaması ({night:g}s):**:\n"
         "• Vampirler birini ısırır\n"
         "• Doktor birini korur\n"
         "• Korunan kişi kurtarılır\n"
-        "• Süre: 60 saniye\n\n"
+        f"• Süre: {night:g} saniye\n\n"
         
         "☀️ **Gündüz Aşaması:**\n"
-        "• 90 saniye tartışma (her 30s bildirim)\n"
-        "• 30 saniye oylama ile linç\n"
+        f"• {phase_seconds(chat_id, 'tartisma'):g} saniye tartışma (son 60/30/10 saniyede bildirim)\n"
+        f"• {phase_seconds(chat_id, 'oylama'):g} saniye oylama ile linç\n"
         "• En çok oy alan idam edilir\n\n"
         
         "🏆 **Kazanma Koşulları:**\n"
@@ -624,132 +2767,152 @@ async def wnasıloynanır(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "• Ölüler oy kullanamaz\n"
         "• Her grupta ayrı oyun oynanır!"
     )
-    
-    await update.message.reply_text(rules_text, parse_mode="Markdown")
+
+async def wnasıloynanır(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show game rules"""
+    await update.message.reply_text(render_rules(update.effective_chat.id), parse_mode="Markdown")
 
 # === GAME LOGIC ===
 
+@tracer.spanned("start_game")
 async def start_game(context: ContextTypes.DEFAULT_TYPE, game: GameState):
     """Start the actual game - GÖRSELLİ ve LAKAPLI"""
-    if len(game.players) < 5:
-        await safe_send_message(context, game.group_id, "❌ Yeterli oyuncu yok! Oyun başlatılamadı.")
-        game.reset()
+    group_id = game.group_id
+    # Son oyuncu listesi oyun başlamadan önce mesaja yansısın
+    await flush_join_message(context, game)
+    
+    async with group_locks.hold(group_id):
+        if game.phase != GamePhase.LOBBY or not game.is_active():
+            return
+        enough_players = len(game.players) >= 5
+        if enough_players:
+            game.assign_roles()
+            game.advance(GamePhase.LOBBY, GamePhase.PLAYING)
+            persist_game(game)
+            metrics.inc("wampir_games_started_total")
+        else:
+            close_game(group_id, game)
+    
+    if not enough_players:
+        await safe_send_message(context, group_id, "❌ Yeterli oyuncu yok! Oyun başlatılamadı.")
         return
     
     await safe_send_photo(
         context,
         game.group_id,
-        IMAGES["START"],
+        "START",
         "🎬 *Oyun Başladı!*\n\n🎭 Roller özelden gönderildi.\n🌙 İlk gece başlıyor..."
     )
     
-    game.assign_roles()
-    game.phase = GamePhase.PLAYING
-    
-    logger.info(f"Grup {game.group_id}: Roller dağıtıldı!")
+    logger.info("Grup %s: Roller dağıtıldı!", game.group_id, extra=game_log(game))
     
-    failed_pms = []
+    role_messages = []
     for player in game.players.values():
-        role_msg = f"🎭 *Rolün: {player.role}*\n\n"
-        
         # Lakap bilgisi
-        if player.lakap and player.lakap != ROLES["KOYLU"]:
-            role_msg += f"🏷️ *Lakabın:* {player.lakap}\n\n"
+        lakap = f"🏷️ *Lakabın:* {player.lakap}\n\n" if player.lakap and player.lakap != ROLES["KOYLU"] else ""
         
         # Takım arkadaşları
-        takim_arkadaslari = []
-        if "Vampir" in player.role:
-            takim_arkadaslari = [p for p in game.players.values() if "Vampir" in p.role and p.user_id != player.user_id]
-            role_msg += "🧛 *Takım Arkadaşların:* "
-            if takim_arkadaslari:
-                role_msg += ", ".join([p.username for p in takim_arkadaslari])
-            else:
-                role_msg += "Tek vampir sensin!"
-            role_msg += "\n\n🌑 *Gece:* Birini ısıracaksın!\n⚠️ Takım arkadaşını seçemezsin."
-        elif "Doktor" in player.role:
-            role_msg += "🩺 *Takımın:* Köylüler\n\n💉 *Gece:* Birini koruyabilirsin!\n⚠️ Takım arkadaşını seçemezsin."
-        elif "Kurt" in player.role:
-            role_msg += "🐺 *Takımın:* Köylüler\n\n🐺 *Gece:* Birini avlayabilirsin!\n🎯 Sadece wampirleri öldürebilirsin."
+        if player.kind == Role.VAMPIR:
+            takim_arkadaslari = [p.md_name for p in game.alive_with_role(Role.VAMPIR) if p.user_id != player.user_id]
+            info = VAMPIR_INFO_TEMPLATE.format(team=", ".join(takim_arkadaslari) or "Tek vampir sensin!")
         else:
-            role_msg += "👨‍🌾 *Takımın:* Köylüler\n\n👨‍🌾 *Gündüz:* Vampirleri bulmaya çalış!\n🗳️ Oylama ile şüpheliyi linç et!"
+            info = ROLE_INFO_TEXT[player.kind]
         
-        if not await safe_send_pm(player.user_id, role_msg):
-            failed_pms.append(player.username)
+        role_messages.append((player.user_id, f"🎭 *Rolün: {player.role}*\n\n{lakap}{info}", None))
+    
+    # Rol mesajlarını paralel gönder
+    results = await fan_out_pms(
+        role_messages,
+        label=f"Grup {game.group_id} rol dağıtımı",
+        priority=MessagePriority.CRITICAL
+    )
+    failed_pms = [
+        player.md_name
+        for player, sent in zip(game.players.values(), results)
+        if not sent
+    ]
     
     if failed_pms:
         await safe_send_message(context, game.group_id, f"⚠️ Roller şu kişilere ulaşılamadı: {', '.join(failed_pms)}")
     
-    await asyncio.sleep(3)
+    await clock.sleep(TRANSITION_PAUSE)
     await start_night(context, game)
 
+@tracer.spanned("start_night")
 async def start_night(context: ContextTypes.DEFAULT_TYPE, game: GameState):
     """Start night phase - BUTONLAR AÇ"""
-    logger.info(f"Grup {game.group_id}: Gece başlıyor - GECE BUTONLARI AÇILIYOR")
+    logger.info("Grup %s: Gece başlıyor - GECE BUTONLARI AÇILIYOR", game.group_id, extra=game_log(game))
     
     await clear_night_buttons(game)
     
-    if game.phase != GamePhase.PLAYING:
-        return
+    async with group_locks.hold(game.group_id):
+        if not game.advance(GamePhase.PLAYING, GamePhase.NIGHT):
+            return
+        game.night_actions = {"vampire": {}, "doctor": None, "kurt": None}
         
-    game.phase = GamePhase.NIGHT
-    game.night_actions = {"vampire": {}, "doctor": None, "kurt": None}
-    
-    vampires = [p for p in game.get_alive_players() if "Vampir" in p.role]
-    doctor = next((p for p in game.get_alive_players() if "Doktor" in p.role), None)
-    kurt = next((p for p in game.get_alive_players() if "Kurt" in p.role), None)
-    
-    game.expected_voters = {p.user_id for p in vampires + ([doctor] if doctor else []) + ([kurt] if kurt else [])}
-    
-    logger.info(f"Grup {game.group_id}: Aktif roller: {len(vampires)} vampir, {'1' if doctor else '0'} doktor, {'1' if kurt else '0'} kurt")
-    
-    # YENİ GECE BUTONLARINI AÇ
-    for player in game.get_alive_players():
-        if "Vampir" in player.role or "Doktor" in player.role or "Kurt" in player.role:
-            try:
-                role_text = ""
-                if "Vampir" in player.role:
-                    role_text = "🌑 *GECE - VAMPİR SIRA*\n\n🩸 Kimi ısıracaksın?\n⏰ Süreniz: 60 saniye\n⚠️ Takım arkadaşınızı seçemezsiniz!"
-                elif "Doktor" in player.role:
-                    role_text = "💉 *GECE - DOKTOR SIRA*\n\n⛑️ Kimi koruyacaksın?\n⏰ Süreniz: 60 saniye\n⚠️ Takım arkadaşınızı seçemezsiniz!"
-                elif "Kurt" in player.role:
-                    role_text = "🐺 *GECE - ALFA KURT SIRA*\n\n⚔️ Kimi avlayacaksın?\n🎯 Sadece wampirleri öldürebilirsin!\n⏰ Süreniz: 60 saniye\n⚠️ Takım arkadaşını seçemezsin!"
-                
-                message = await app.bot.send_message(
-                    chat_id=player.user_id,
-                    text=role_text,
-                    reply_markup=build_player_buttons(game, group_id=game.group_id, phase="night"),
-                    parse_mode="Markdown"
-                )
-                game.night_button_messages[player.user_id] = message.message_id
-                logger.info(f"Grup {game.group_id}: {player.username} için GECE butonları açıldı")
-            except Exception as e:
-                logger.error(f"Grup {game.group_id}: {player.username} gece buton hatası: {e}")
+        vampires = game.alive_with_role(Role.VAMPIR)
+        doctor = game.first_alive_with_role(Role.DOKTOR)
+        kurt = game.first_alive_with_role(Role.KURT)
+        
+        game.expected_voters = {p.user_id for p in vampires + ([doctor] if doctor else []) + ([kurt] if kurt else [])}
+    
+    logger.info("Grup %s: Aktif roller: %d vampir, %d doktor, %d kurt", game.group_id, len(vampires), 1 if doctor else 0, 1 if kurt else 0, extra=game_log(game))
+    
+    # YENİ GECE BUTONLARINI AÇ - tüm rollere paralel
+    night_players = vampires + ([doctor] if doctor else []) + ([kurt] if kurt else [])
+    night_seconds = phase_seconds(game.group_id, "gece")
+    role_texts = {kind: template.format(seconds=night_seconds) for kind, template in NIGHT_ROLE_TEMPLATES.items()}
+    markup = build_player_buttons(game, group_id=game.group_id, phase="night")
+    jobs = [
+        send_night_buttons(game, player, role_texts[player.kind], markup)
+        for player in night_players
+    ]
+    
+    message_ids = await fan_out(jobs, label=f"Grup {game.group_id} gece butonları")
+    async with group_locks.hold(game.group_id):
+        for player, message_id in zip(night_players, message_ids):
+            if message_id is not None:
+                game.night_button_messages[player.user_id] = message_id
     
     kurt_text = "🐺 Alfa Kurt avlanıyor...\n" if kurt else ""
     await safe_send_message(
         context, game.group_id,
-        f"🌙 *GECE BAŞLADI!*\n\n🧛‍♂️ Vampirler avlanıyor...\n🩺 Doktor hazırlık yapıyor...\n{kurt_text}👻 Köylüler uyuyor...\n\n⏰ *Karar süresi: 60 saniye*"
+        NIGHT_START_TEMPLATE.format(kurt=kurt_text, seconds=night_seconds)
     )
     
-    if game._timer_task and not game._timer_task.done():
-        game._timer_task.cancel()
-    
-    game._timer_task = asyncio.create_task(night_timer_60s(context, game))
+    start_night_timer(context, game)
+    persist_game(game)
 
-async def night_timer_60s(context: ContextTypes.DEFAULT_TYPE, game: GameState):
-    """60 saniye gece oylama timer'ı"""
+def start_night_timer(context: ContextTypes.DEFAULT_TYPE, game: GameState, duration: Optional[float] = None):
+    """Gece oylama timer'ı"""
+    duration = phase_seconds(game.group_id, "gece") if duration is None else duration
+    group_id = game.group_id
+    logger.info("Grup %s: %.0f saniye gece timer'ı başladı!", group_id, duration, extra=game_log(game))
+    
+    game.arm_phase_timer(PhaseTimer(
+        duration,
+        on_expire=transition_on_expire(game, lambda: night_timer_expired(context, game), "end_night"),
+        warnings={
+            seconds_left: phase_warning(context, game, GamePhase.NIGHT, text)
+            for seconds_left, text in NIGHT_WARNINGS.items()
+        }
+    ), "night")
+
+def phase_warning(
+    context: ContextTypes.DEFAULT_TYPE,
+    game: GameState,
+    phase: GamePhase,
+    text: str
+) -> Callable[[], Awaitable[Any]]:
+    """Faz hâlâ sürüyorsa gruba uyarı gönderen zamanlayıcı callback'i"""
+    async def warn():
+        if game.phase == phase:
+            await safe_send_message(context, game.group_id, text)
+    return warn
+
+async def night_timer_expired(context: ContextTypes.DEFAULT_TYPE, game: GameState):
+    """Gece süresi doldu"""
     group_id = game.group_id
-    logger.info(f"Grup {group_id}: 60 saniye gece timer'ı başladı!")
-    
-    for remaining in range(60, 0, -1):
-        if game.phase != GamePhase.NIGHT:
-            return
-        await asyncio.sleep(1)
-        
-        if remaining == 30:
-            await safe_send_message(context, group_id, "⚠️ *GECE UYARISI*\n\n⏳ 30 saniye kaldı!\n🧛‍♂️ Vampirler ve 🩺 Doktor hızlı karar versin!")
-        elif remaining == 10:
-            await safe_send_message(context, group_id, "🚨 *GECE SON 10 SANİYE!*\n\n⏰ Karar süreniz bitmek üzere!\nOy kullanmayanlar için otomatik devam edilecek!")
     
     if game.phase != GamePhase.NIGHT:
         return
@@ -764,13 +2927,16 @@ async def night_timer_60s(context: ContextTypes.DEFAULT_TYPE, game: GameState):
     
     await end_night(context, game)
 
+@tracer.spanned("end_night")
 async def end_night(context: ContextTypes.DEFAULT_TYPE, game: GameState):
     """Gece sonu - GECE BUTONLARI KAPAT"""
     group_id = game.group_id
-    logger.info(f"Grup {group_id}: end_night çağrıldı! GECE BUTONLARI KAPATILIYOR")
+    logger.info("Grup %s: end_night çağrıldı! GECE BUTONLARI KAPATILIYOR", group_id, extra=game_log(game))
     
-    if game.phase != GamePhase.NIGHT:
-        return
+    # Fazı sahiplen - aynı gece iki kez işlenmesin, geç gelen aksiyonlar reddedilsin
+    async with group_locks.hold(group_id):
+        if not game.advance(GamePhase.NIGHT, GamePhase.PLAYING):
+            return
     
     await clear_night_buttons(game)
     
@@ -778,44 +2944,48 @@ async def end_night(context: ContextTypes.DEFAULT_TYPE, game: GameState):
     doctor_action = bool(game.night_actions["doctor"])
     kurt_action = bool(game.night_actions["kurt"])
     
-    night_summary = (
-        f"🌅 *Gece Bitti*\n\n"
-        f"🧛‍♂️ Vampirler: {'birini ısırdı' if vampire_actions > 0 else 'avlanmadı'}\n"
-        f"🩺 Doktor: {'koruma yaptı' if doctor_action else 'koruma yapmadı'}\n"
-        f"🐺 Alfa Kurt: {'avlandı' if kurt_action else 'avlanmadı'}"
+    night_summary = NIGHT_SUMMARY_TEMPLATE.format(
+        vampire='birini ısırdı' if vampire_actions > 0 else 'avlanmadı',
+        doctor='koruma yaptı' if doctor_action else 'koruma yapmadı',
+        kurt='avlandı' if kurt_action else 'avlanmadı'
     )
     
     await safe_send_message(context, group_id, night_summary)
     
     deaths = set()
-    protected = game.night_actions["doctor"]
-    kurt_target = game.night_actions["kurt"]
-    
-    kurt_killed_vampire = False
-    if kurt_target and kurt_target not in game.dead:
-        kurt_target_player = game.players[kurt_target]
-        if "Vampir" in kurt_target_player.role:
-            if kurt_target != protected:
-                deaths.add(kurt_target)
-                kurt_killed_vampire = True
-    
-    for vampire_id, target_id in game.night_actions["vampire"].items():
-        if target_id == protected:
-            continue
-        if target_id in deaths:
-            continue
-        if target_id not in game.dead:
-            deaths.add(target_id)
+    async with group_locks.hold(group_id):
+        protected = game.night_actions["doctor"]
+        kurt_target = game.night_actions["kurt"]
+        
+        kurt_killed_vampire = False
+        if kurt_target and kurt_target not in game.dead:
+            kurt_target_player = game.players[kurt_target]
+            if kurt_target_player.kind == Role.VAMPIR:
+                if kurt_target != protected:
+                    deaths.add(kurt_target)
+                    kurt_killed_vampire = True
+        
+        for vampire_id, target_id in game.night_actions["vampire"].items():
+            if target_id == protected:
+                continue
+            if target_id in deaths:
+                continue
+            if target_id not in game.dead:
+                deaths.add(target_id)
+        
+        for death_id in deaths:
+            game.kill_player(death_id)
+        persist_game(game)
     
     if deaths:
-        death_msg = "💀 *Gece Kurbanları:*\n"
         for death_id in deaths:
-            game.kill_player(death_id)
-            player_name = next(p.username for p in game.players.values() if p.user_id == death_id)
-            death_msg += f"• {player_name} ({game.players[death_id].role})\n"
-            await send_mention(context, group_id, death_id, "gece öldürüldü! 💀")
+            await send_mention(context, group_id, death_id, "gece öldürüldü! 💀", priority=MessagePriority.CRITICAL)
         
-        await safe_send_message(context, group_id, death_msg)
+        death_msg = "💀 *Gece Kurbanları:*\n" + "".join([
+            f"• {game.players[death_id].md_name} ({game.players[death_id].role})\n"
+            for death_id in deaths
+        ])
+        await safe_send_message(context, group_id, death_msg, priority=MessagePriority.CRITICAL)
     else:
         await safe_send_message(context, group_id, "🌙 Gece sakin geçti... Kimse ölmedi.")
     
@@ -823,75 +2993,69 @@ async def end_night(context: ContextTypes.DEFAULT_TYPE, game: GameState):
         await end_game(context, game, is_night_end=True)
         return
     
-    game.phase = GamePhase.PLAYING
-    await asyncio.sleep(3)
+    await clock.sleep(TRANSITION_PAUSE)
     
-    logger.info(f"Grup {group_id}: ☀️ Gündüz başlıyor...")
+    logger.info("Grup %s: ☀️ Gündüz başlıyor...", group_id, extra=game_log(game))
     await start_day(context, game)
 
+@tracer.spanned("start_day")
 async def start_day(context: ContextTypes.DEFAULT_TYPE, game: GameState):
-    """90 saniye gündüz tartışma - BUTON YOK"""
+    """Gündüz tartışma - BUTON YOK"""
     group_id = game.group_id
-    logger.info(f"Grup {group_id}: Gündüz başlıyor - 90s tartışma (BUTON YOK)")
+    logger.info("Grup %s: Gündüz başlıyor - %gs tartışma (BUTON YOK)", group_id, phase_seconds(group_id, "tartisma"), extra=game_log(game))
     
-    if game.phase != GamePhase.PLAYING:
-        return
-        
-    game.phase = GamePhase.DAY
-    game.votes = {}
-    game.expected_voters = {p.user_id for p in game.get_alive_players()}
+    async with group_locks.hold(group_id):
+        if not game.advance(GamePhase.PLAYING, GamePhase.DAY):
+            return
+        game.tally.clear()
+        game.expected_voters = {p.user_id for p in game.get_alive_players()}
     
     await safe_send_message(
         context, group_id, 
-        "☀️ *GÜNDÜZ BAŞLADI!*\n\n😱 Köylüler panik içinde uyandı!\n💀 Gece kurbanları arasında kayıplar var mı?\n🧛‍♂️ Vampirin kim olduğunu tartışın!\n\n⏰ *Tartışma süresi: 90 saniye*\n🗳️ Ardından oylama yapılacak!"
+        "☀️ *GÜNDÜZ BAŞLADI!*\n\n😱 Köylüler panik içinde uyandı!\n💀 Gece kurbanları arasında kayıplar var mı?\n🧛‍♂️ Vampirin kim olduğunu tartışın!\n\n"
+        f"⏰ *Tartışma süresi: {phase_seconds(group_id, 'tartisma'):g} saniye*\n🗳️ Ardından oylama yapılacak!"
     )
     
-    if game._timer_task and not game._timer_task.done():
-        game._timer_task.cancel()
-    
-    game._timer_task = asyncio.create_task(discussion_timer(context, game))
+    start_discussion_timer(context, game)
+    persist_game(game)
 
-async def discussion_timer(context: ContextTypes.DEFAULT_TYPE, game: GameState):
-    """90 saniye tartışma timer'ı - SONUNDA BUTON AÇ"""
+def start_discussion_timer(context: ContextTypes.DEFAULT_TYPE, game: GameState, duration: Optional[float] = None):
+    """Gündüz tartışma zamanlayıcısı - 60/30/10 saniye uyarılarıyla"""
+    duration = phase_seconds(game.group_id, "tartisma") if duration is None else duration
+    
+    game.arm_phase_timer(PhaseTimer(
+        duration,
+        on_expire=transition_on_expire(game, lambda: discussion_timer_expired(context, game), "start_voting"),
+        warnings={
+            seconds_left: phase_warning(context, game, GamePhase.DAY, text)
+            for seconds_left, text in DISCUSSION_WARNINGS.items()
+        }
+    ), "discussion")
+
+async def discussion_timer_expired(context: ContextTypes.DEFAULT_TYPE, game: GameState):
+    """Tartışma bitti - BUTONLAR AÇILIR"""
     group_id = game.group_id
+    if game.phase != GamePhase.DAY:
+        return
     
-    notifications = {
-        60: "⏳ *60 SANİYE KALDI!*\n\nTartışmalar kızışıyor... Şüphelerinizi paylaşın!",
-        30: "⚠️ *30 SANİYE KALDI!*\n\nKarar verme zamanı yaklaşıyor! Kim şüpheli?",
-        10: "🚨 *SON 10 SANİYE!*\n\nOylama başlıyor! Hızlıca son sözlerinizi söyleyin!"
-    }
-    
-    for remaining in range(90, 0, -1):
-        if game.phase != GamePhase.DAY:
-            return
-        await asyncio.sleep(1)
-        
-        if remaining in notifications:
-            await safe_send_message(context, group_id, notifications[remaining])
-    
-    logger.info(f"Grup {group_id}: 💬 Tartışma aşaması bitti! BUTONLAR AÇILIYOR...")
+    logger.info("Grup %s: 💬 Tartışma aşaması bitti! BUTONLAR AÇILIYOR...", group_id, extra=game_log(game))
     
     await safe_send_message(context, group_id, "⏰ *TARTIŞMA BİTTİ!*\n\n🗳️ Oylama başlıyor... Kimi linç edeceksiniz?")
     
     await start_voting(context, game)
 
+@tracer.spanned("start_voting")
 async def start_voting(context: ContextTypes.DEFAULT_TYPE, game: GameState):
-    """30 saniye gündüz oylama - BUTONLAR AÇ"""
+    """Gündüz oylama - BUTONLAR AÇ"""
     group_id = game.group_id
-    logger.info(f"Grup {group_id}: 🗳️ 30 saniye oylama başlıyor! BUTONLAR AÇILIYOR")
+    logger.info("Grup %s: 🗳️ %g saniye oylama başlıyor! BUTONLAR AÇILIYOR", group_id, phase_seconds(group_id, "oylama"), extra=game_log(game))
     
     if not game.expected_voters:
         await safe_send_message(context, group_id, "❌ Oy verecek canlı oyuncu yok! Gündüz iptal edildi.")
         await end_day(context, game)
         return
     
-    vote_msg = (
-        "🗳️ *OYLAMA BAŞLADI!*\n\n"
-        "⚰️ Kimi linç edeceksiniz?\n"
-        "👆 En çok oy alan idam edilecek!\n\n"
-        "⏰ *Oylama süresi: 30 saniye*\n"
-        "⚡ Oy kullanmayanlar otomatik geçilecek!"
-    )
+    vote_msg = render_vote_message(game)
     
     markup = build_player_buttons(game, only_alive=True, group_id=group_id, phase="day")
     if not markup:
@@ -899,40 +3063,98 @@ async def start_voting(context: ContextTypes.DEFAULT_TYPE, game: GameState):
         await end_day(context, game)
         return
     
-    sent_message = await context.bot.send_message(
-        chat_id=group_id,
-        text=vote_msg,
-        reply_markup=markup,
-        parse_mode="Markdown"
+    sent_message = await outbound.submit(
+        group_id,
+        functools.partial(
+            context.bot.send_message,
+            chat_id=group_id,
+            text=vote_msg,
+            reply_markup=markup,
+            parse_mode="Markdown"
+        ),
+        MessagePriority.CRITICAL
     )
-    game.vote_message_id = sent_message.message_id
-    
-    logger.info(f"Grup {group_id}: 🗳️ Oylama butonları açıldı, ID: {game.vote_message_id}")
+    async with group_locks.hold(group_id):
+        game.vote_message_id = sent_message.message_id
     
-    if game._timer_task and not game._timer_task.done():
-        game._timer_task.cancel()
+    logger.info("Grup %s: 🗳️ Oylama butonları açıldı, ID: %s", group_id, game.vote_message_id, extra=game_log(game))
     
-    game._timer_task = asyncio.create_task(voting_timer(context, game))
+    start_voting_timer(context, game)
+    persist_game(game)
+
+def render_vote_message(game: GameState) -> str:
+    """Oylama mesajı - oy geldikçe anlık sayım eklenir"""
+    seconds = phase_seconds(game.group_id, 'oylama')
+    vote_msg = cached_render(game, "vote", seconds, lambda: VOTE_HEADER_TEMPLATE.format(seconds=seconds))
+    if not game.tally:
+        return vote_msg
+    players = game.players
+    standings = "".join([
+        f"• {players[target_id].md_name}: {count} oy\n"
+        for target_id, count in game.tally.standings()
+    ])
+    return f"{vote_msg}\n\n📊 *Anlık Durum:*\n{standings}🗳️ {len(game.tally)}/{len(game.expected_voters)} kişi oy kullandı"
+
+def get_vote_editor(context: ContextTypes.DEFAULT_TYPE, game: GameState) -> 'CoalescedEditor':
+    """Oylama mesajının canlı sayım düzenleyicisi - yoksa oluştur"""
+    if game.vote_editor is None:
+        group_id = game.group_id
+        
+        def render():
+            if game.phase != GamePhase.DAY or not game.vote_message_id:
+                return None
+            markup = build_player_buttons(game, only_alive=True, group_id=group_id, phase="day")
+            return render_vote_message(game), markup
+        
+        async def send(text: str, reply_markup: Optional[InlineKeyboardMarkup]) -> bool:
+            try:
+                await outbound.submit(
+                    group_id,
+                    functools.partial(
+                        context.bot.edit_message_text,
+                        chat_id=group_id,
+                        message_id=game.vote_message_id,
+                        text=text,
+                        reply_markup=reply_markup,
+                        parse_mode="Markdown"
+                    )
+                )
+            except Exception as e:
+                logger.error("Grup %s: Oylama mesajı güncelleme hatası: %s", group_id, e, extra=game_log(game))
+                return False
+            return True
+        
+        game.vote_editor = CoalescedEditor(render, send, VOTE_EDIT_INTERVAL)
+    return game.vote_editor
 
-async def voting_timer(context: ContextTypes.DEFAULT_TYPE, game: GameState):
-    """30 saniye oylama timer'ı"""
+def start_voting_timer(context: ContextTypes.DEFAULT_TYPE, game: GameState, duration: Optional[float] = None):
+    """Oylama zamanlayıcısı - 15 saniye uyarısıyla"""
+    duration = phase_seconds(game.group_id, "oylama") if duration is None else duration
     group_id = game.group_id
     
-    await asyncio.sleep(15)
-    if game.phase == GamePhase.DAY:
-        total_voters = len(game.expected_voters)
-        voted_count = len(game.votes)
-        await safe_send_message(
-            context, group_id,
-            f"⚠️ *OYLAMA UYARISI*\n\n⏳ 15 saniye kaldı!\n📊 {voted_count}/{total_voters} kişi oy kullandı\n⚡ Kalanlar için otomatik devam edilecek!"
-        )
+    async def warn_15():
+        if game.phase == GamePhase.DAY:
+            total_voters = len(game.expected_voters)
+            voted_count = len(game.votes)
+            await safe_send_message(
+                context, group_id,
+                f"⚠️ *OYLAMA UYARISI*\n\n⏳ 15 saniye kaldı!\n📊 {voted_count}/{total_voters} kişi oy kullandı\n⚡ Kalanlar için otomatik devam edilecek!"
+            )
     
-    await asyncio.sleep(15)
+    game.arm_phase_timer(PhaseTimer(
+        duration,
+        on_expire=transition_on_expire(game, lambda: voting_timer_expired(context, game), "end_day"),
+        warnings={15: warn_15}
+    ), "voting")
+
+async def voting_timer_expired(context: ContextTypes.DEFAULT_TYPE, game: GameState):
+    """Oylama süresi doldu"""
+    group_id = game.group_id
     
     if game.phase == GamePhase.DAY:
         total_voters = len(game.expected_voters)
         voted_count = len(game.votes)
-        logger.info(f"Grup {group_id}: 🗳️ 30 saniye DOLDU! {voted_count}/{total_voters} oy kullanıldı")
+        logger.info("Grup %s: 🗳️ Oylama süresi DOLDU! %s/%s oy kullanıldı", group_id, voted_count, total_voters, extra=game_log(game))
         
         await safe_send_message(
             context, group_id,
@@ -941,156 +3163,72 @@ async def voting_timer(context: ContextTypes.DEFAULT_TYPE, game: GameState):
         
         await end_day(context, game)
 
+@tracer.spanned("end_day")
 async def end_day(context: ContextTypes.DEFAULT_TYPE, game: GameState):
-    """Gündüz oylama sonuçlarını işle - BUTONLARI KAPAT"""
+    """Gündüz oylama sonuçlarını işle - BERABERLİKTE KİMSE ÖLMESİN"""
     group_id = game.group_id
-    logger.info(f"Grup {group_id}: ⚰️ Gündüz oylama sonuçları işleniyor...")
-    
-    if game.vote_message_id:
-        try:
-            await context.bot.edit_message_reply_markup(
-                chat_id=group_id,
-                message_id=game.vote_message_id,
-                reply_markup=None
-            )
-            logger.info(f"Grup {group_id}: 🗑️ Gündüz oylama butonları KAPATILDI")
-        except Exception as e:
-            logger.error(f"Grup {group_id}: Gündüz buton kapatma hatası: {e}")
-        finally:
-            game.vote_message_id = None
-    
-    if game.phase != GamePhase.DAY:
-        return
+    logger.info("Grup %s: ⚰️ Gündüz oylama sonuçları işleniyor...", group_id, extra=game_log(game))
     
-    total_voters = len(game.expected_voters)
-    voted_count = len(game.votes)
+    # Fazı sahiplen - zamanlayıcı ve son oy aynı anda gelirse tek sefer işlensin
+    async with group_locks.hold(group_id):
+        claimed = game.advance(GamePhase.DAY, GamePhase.PLAYING)
+        vote_message_id = game.vote_message_id
+        game.vote_message_id = None
+        vote_editor, game.vote_editor = game.vote_editor, None
     
-    if not game.votes or voted_count == 0:
-        await safe_send_message(
-            context, group_id, 
-            f"❌ *KİMSE OY KULLANMADI!*\n\n📊 {voted_count}/{total_voters} kişi oy bekliyordu\n🎲 Rastgele seçim yapılıyor..."
-        )
-        if game.expected_voters:
-            target = random.choice(list(game.expected_voters))
-            target_player = game.players.get(target)
-            if target_player:
-                game.kill_player(target)
-                await send_mention(context, group_id, target, "rastgele seçildi ve linç edildi! 💀")
-        else:
-            await safe_send_message(context, group_id, "❌ Linç edilecek kimse yok!")
-    else:
-        vote_counts = {}
-        voter_details = {}
-        
-        for voter_id, target_id in game.votes.items():
-            vote_counts[target_id] = vote_counts.get(target_id, 0) + 1
-            voter_name = game.players[voter_id].username
-            target_name = game.players[target_id].username
-            if target_id not in voter_details:
-                voter_details[target_id] = []
-            voter_details[target_id].append(voter_name)
-        
-        max_votes = max(vote_counts.values())
-        candidates = [uid for uid, count in vote_counts.items() if count == max_votes]
-        
-        if len(candidates) > 1:
-            candidate_names = [game.players[c].username for c in candidates]
-            await safe_send_message(
-                context, group_id,
-                f"⚖️ *BERABERLİK!*\n\n📊 {max_votes} oy alan {len(candidates)} kişi:\n• {', '.join(candidate_names)}\n\n🎲 Rastgele biri seçilecek..."
-            )
-        
-        target = random.choice(candidates) if len(candidates) > 1 else candidates[0]
-        target_player = game.players.get(target)
-        
-        if target_player:
-            game.kill_player(target)
-            
-            execution_msg = (
-                f"⚰️ *LİNÇ SONUCU*\n\n"
-                f"🎯 *İdam Edilen:* [{target_player.username}](tg://user?id={target})\n"
-                f"🎭 *Rolü:* {target_player.role}\n"
-                f"📊 *Oy Sayısı:* {max_votes}\n\n"
-            )
-            
-            execution_msg += "🗳️ *Oy Dağılımı:*\n"
-            for target_id, voters in voter_details.items():
-                target_name = game.players[target_id].username
-                execution_msg += f"• {target_name}: {', '.join(voters)} ({len(voters)} oy)\n"
-            
-            execution_msg += f"\n📈 Toplam {voted_count}/{total_voters} oy kullanıldı"
-            
-            await 
-            async def end_day(context: ContextTypes.DEFAULT_TYPE, game: GameState):
-    """Gündüz oylama sonuçlarını işle - BERABERLİKTE KİMSE ÖLMESİN"""
-    group_id = game.group_id
-    logger.info(f"Grup {group_id}: ⚰️ Gündüz oylama sonuçları işleniyor...")
+    # Süren canlı sayım düzenlemesi klavyeyi geri getirmesin
+    if vote_editor:
+        await vote_editor.close()
     
     # ✅ GÜNDÜZ BUTONLARINI KAPAT
-    if game.vote_message_id:
+    if vote_message_id:
         try:
-            await context.bot.edit_message_reply_markup(
-                chat_id=group_id,
-                message_id=game.vote_message_id,
-                reply_markup=None
+            await outbound.submit(
+                group_id,
+                functools.partial(
+                    context.bot.edit_message_reply_markup,
+                    chat_id=group_id,
+                    message_id=vote_message_id,
+                    reply_markup=None
+                ),
+                MessagePriority.CRITICAL
             )
-            logger.info(f"Grup {group_id}: 🗑️ Gündüz oylama butonları KAPATILDI")
+            logger.info("Grup %s: 🗑️ Gündüz oylama butonları KAPATILDI", group_id, extra=game_log(game))
         except Exception as e:
-            logger.error(f"Grup {group_id}: Gündüz buton kapatma hatası: {e}")
-        finally:
-            game.vote_message_id = None
+            logger.error("Grup %s: Gündüz buton kapatma hatası: %s", group_id, e, extra=game_log(game))
     
-    if game.phase != GamePhase.DAY:
+    if not claimed:
         return
     
+    tally = game.tally
     total_voters = len(game.expected_voters)
-    voted_count = len(game.votes)
+    voted_count = len(tally)
     
-    if not game.votes or voted_count == 0:
+    if voted_count == 0:
         await safe_send_message(
             context, group_id, 
             f"❌ *KİMSE OY KULLANMADI!*\n\n"
             f"📊 {voted_count}/{total_voters} kişi oy bekliyordu\n"
             f"🤔 Köylüler kararsız kaldı ve kimse ölmedi!"
         )
-        logger.info(f"Grup {group_id}: ⚖️ Hiç oy kullanılmadı - kimse ölmedi")
+        logger.info("Grup %s: ⚖️ Hiç oy kullanılmadı - kimse ölmedi", group_id, extra=game_log(game))
     else:
-        vote_counts = {}
-        voter_details = {}
+        logger.info("Grup %s: 🗳️ Oylama sonuçları: %s", group_id, tally.counts, extra=game_log(game))
         
-        for voter_id, target_id in game.votes.items():
-            vote_counts[target_id] = vote_counts.get(target_id, 0) + 1
-            voter_name = game.players[voter_id].username
-            target_name = game.players[target_id].username
-            if target_id not in voter_details:
-                voter_details[target_id] = []
-            voter_details[target_id].append(voter_name)
-        
-        logger.info(f"Grup {group_id}: 🗳️ Oylama sonuçları: {vote_counts}")
-        
-        max_votes = max(vote_counts.values())
-        candidates = [uid for uid, count in vote_counts.items() if count == max_votes]
+        max_votes = tally.max_votes
+        candidates = tally.leaders()
         
         # ✅ YENİ: BERABERLİKTE KİMSE ÖLMESİN
         if len(candidates) > 1:
-            candidate_names = [game.players[c].username for c in candidates]
+            candidate_names = [game.players[c].md_name for c in candidates]
             await safe_send_message(
                 context, group_id,
-                f"⚖️ *BERABERLİK!*\n\n"
-                f"📊 {max_votes} oy alan {len(candidates)} kişi:\n"
-                f"• {', '.join(candidate_names)}\n\n"
-                f"🤔 *Köylüler kararsız kaldı ve kimse ölmedi!*\n"
-                f"🌙 Gece yaklaşıyor, vampirler için yeni bir şans..."
+                TIE_TEMPLATE.format(votes=max_votes, count=len(candidates), names=", ".join(candidate_names))
             )
-            logger.info(f"Grup {group_id}: ⚖️ Beraberlik - kimse ölmedi: {candidate_names}")
+            logger.info("Grup %s: ⚖️ Beraberlik - kimse ölmedi: %s", group_id, candidate_names, extra=game_log(game))
             
             # Detaylı oy dağılımını göster
-            distribution_msg = "🗳️ *Oy Dağılımı:*\n"
-            for target_id, voters in voter_details.items():
-                target_name = game.players[target_id].username
-                distribution_msg += f"• {target_name}: {', '.join(voters)} ({len(voters)} oy)\n"
-            
-            distribution_msg += f"\n📈 Toplam {voted_count}/{total_voters} oy kullanıldı"
+            distribution_msg = f"{render_vote_distribution(game)}\n📈 Toplam {voted_count}/{total_voters} oy kullanıldı"
             await safe_send_message(context, group_id, distribution_msg, parse_mode="Markdown")
             
         else:
@@ -1099,57 +3237,56 @@ async def end_day(context: ContextTypes.DEFAULT_TYPE, game: GameState):
             target_player = game.players.get(target)
             
             if target_player:
-                game.kill_player(target)
+                async with group_locks.hold(group_id):
+                    game.kill_player(target)
+                    persist_game(game)
                 
-                execution_msg = (
-                    f"⚰️ *LİNÇ SONUCU*\n\n"
-                    f"🎯 *İdam Edilen:* [{target_player.username}](tg://user?id={target})\n"
-                    f"🎭 *Rolü:* {target_player.role}\n"
-                    f"📊 *Oy Sayısı:* {max_votes}\n\n"
+                # Kimler kime oy vermiş detayı dahil
+                execution_msg = EXECUTION_TEMPLATE.format(
+                    name=target_player.md_name,
+                    user_id=target,
+                    role=target_player.role,
+                    votes=max_votes,
+                    distribution=render_vote_distribution(game),
+                    voted=voted_count,
+                    total=total_voters
                 )
                 
-                # Kimler kime oy vermiş detayı
-                execution_msg += "🗳️ *Oy Dağılımı:*\n"
-                for target_id, voters in voter_details.items():
-                    target_name = game.players[target_id].username
-                    execution_msg += f"• {target_name}: {', '.join(voters)} ({len(voters)} oy)\n"
-                
-                execution_msg += f"\n📈 Toplam {voted_count}/{total_voters} oy kullanıldı"
+                await safe_send_message(context, group_id, execution_msg, parse_mode="Markdown", priority=MessagePriority.CRITICAL)
+                logger.info("Grup %s: ⚰️ Linç: %s (%s) - %s oy", group_id, target_player.username, target_player.role, max_votes, extra=game_log(game, target))
                 
-                await safe_send_message(context, group_id, execution_msg, parse_mode="Markdown")
-                logger.info(f"Grup {group_id}: ⚰️ Linç: {target_player.username} ({target_player.role}) - {max_votes} oy")
-                
-                await send_mention(context, group_id, target, "linç edildi! 💀")
+                await send_mention(context, group_id, target, "linç edildi! 💀", priority=MessagePriority.CRITICAL)
             else:
                 await safe_send_message(context, group_id, "❌ Linç hatası!")
-                logger.error(f"Grup {group_id}: ⚰️ Linç - Geçersiz hedef oyuncu")
+                logger.error("Grup %s: ⚰️ Linç - Geçersiz hedef oyuncu", group_id, extra=game_log(game))
+    persist_game(game)
     
-    await asyncio.sleep(3)
+    await clock.sleep(TRANSITION_PAUSE)
     
     if check_win_condition(game):
         await end_game(context, game)
         return
     
-    game.phase = GamePhase.PLAYING
-    await asyncio.sleep(3)
+    await clock.sleep(TRANSITION_PAUSE)
     
     # Yeni geceye geç
-    await safe_send_message(
-        context, group_id, 
-        "🌙 *YENİ GECE BAŞLIYOR...*\n\n"
-        "👻 Kötü rüyalar görecek olanlar var!\n"
-        "⏰ Gecenin karanlığında av başlıyor...\n"
-        "⚡ Otomatik devam ediliyor!"
-    )
+    await safe_send_message(context, group_id, NEW_NIGHT_TEXT)
     
-    await asyncio.sleep(3)
+    await clock.sleep(TRANSITION_PAUSE)
     await start_night(context, game)
 
+def render_vote_distribution(game: GameState) -> str:
+    """Kimin kime oy verdiği - tally'deki ilk oy sırasıyla"""
+    players = game.players
+    return "🗳️ *Oy Dağılımı:*\n" + "".join([
+        f"• {players[target_id].md_name}: {', '.join([players[v].md_name for v in voter_ids])} ({len(voter_ids)} oy)\n"
+        for target_id, voter_ids in game.tally.voters.items()
+    ])
+
 def check_win_condition(game: GameState) -> bool:
     """Check if game should end"""
-    alive_players = game.get_alive_players()
-    alive_vampires = sum(1 for p in alive_players if "Vampir" in p.role)
-    alive_non_vampires = len(alive_players) - alive_vampires
+    alive_vampires = game.alive_vampire_count()
+    alive_non_vampires = game.alive_village_count()
     
     if alive_vampires >= alive_non_vampires and alive_vampires > 0:
         return True
@@ -1157,30 +3294,39 @@ def check_win_condition(game: GameState) -> bool:
         return True
     return False
 
+@tracer.spanned("end_game")
 async def end_game(context: ContextTypes.DEFAULT_TYPE, game: GameState, is_night_end: bool = False):
     """End the game and show results - GÖRSELLİ"""
     group_id = game.group_id
-    game.set_active(False)
+    async with group_locks.hold(group_id):
+        # Oyun bir kez biter - ikinci çağrı sonuçları tekrar duyurmasın
+        if not game.advance(GamePhase.PLAYING, GamePhase.ENDED):
+            return
+        game.set_active(False)
+        snapshots.discard(group_id)
     
-    alive_vampires = any(p.alive and "Vampir" in p.role for p in game.players.values())
+    alive_vampires = game.alive_vampire_count() > 0
     winner = "🧛‍♂️ Vampirler" if alive_vampires else "👨‍🌾 Köylüler"
     
-    image_url = IMAGES["VAMPIR_WIN"] if alive_vampires else IMAGES["KOYLU_WIN"]
+    image_key = "VAMPIR_WIN" if alive_vampires else "KOYLU_WIN"
+    metrics.inc("wampir_games_finished_total", winner="vampir" if alive_vampires else "koylu")
     
-    results_text = f"🏆 *{winner} Kazandı!*\n\n📊 *Son Durum:*\n"
-    
-    for player in game.players.values():
-        status = "💀 Öldü" if not player.alive else "❤️ Hayatta"
-        results_text += f"• {player.username}: {player.role} - {status}\n"
+    results_text = f"🏆 *{winner} Kazandı!*\n\n📊 *Son Durum:*\n" + "".join([
+        f"• {player.md_name}: {player.role} - {'❤️ Hayatta' if player.alive else '💀 Öldü'}\n"
+        for player in game.players.values()
+    ])
     
-    await safe_send_photo(context, group_id, image_url, results_text, parse_mode="Markdown")
+    await safe_send_photo(context, group_id, image_key, results_text, parse_mode="Markdown")
     
-    logger.info(f"Grup {group_id}: 🏆 Oyun bitti! Kazanan: {winner}")
+    logger.info("Grup %s: 🏆 Oyun bitti! Kazanan: %s", group_id, winner, extra=game_log(game))
     
-    await asyncio.sleep(5)
-    game.reset()
+    await clock.sleep(END_GAME_PAUSE)
+    async with group_locks.hold(group_id):
+        # Bu arada /wstart ile yeni oyun açıldıysa ona dokunma
+        if not game.is_active():
+            close_game(group_id, game)
     
-    await safe_send_message(context, group_id, "🔄 Oyun bitti! Yeni oyun için /wstart kullanın.")
+    post_message(context, group_id, "🔄 Oyun bitti! Yeni oyun için /wstart kullanın.")
 
 # === CALLBACK HANDLER ===
 
@@ -1191,31 +3337,35 @@ async def handle_join_button(query, context: ContextTypes.DEFAULT_TYPE):
     
     game = get_game(group_id)
     
-    if not game.is_active() or game.phase != GamePhase.LOBBY:
-        await query.answer("❌ Bu oyun artık aktif değil!", show_alert=True)
+    if game is None or not game.is_active() or game.phase != GamePhase.LOBBY:
+        await answer_query(query, "❌ Bu oyun artık aktif değil!", show_alert=True)
         return
     
     if user.id in game.players:
-        await query.answer("❌ Zaten bu oyundasınız!", show_alert=True)
+        await answer_query(query, "❌ Zaten bu oyundasınız!", show_alert=True)
         return
     
     try:
-        test_msg = await context.bot.send_message(
-            chat_id=user.id,
-            text="🤖 *Vampir Köylü Botu*\n\n🎮 Oyuna katılmak için aşağıdaki butona tıklayın!",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🎮 Oyuna Katıl", callback_data=f"pm_join_{group_id}")
-            ]]),
-            parse_mode="Markdown"
+        test_msg = await outbound.submit(
+            user.id,
+            functools.partial(
+                context.bot.send_message,
+                chat_id=user.id,
+                text="🤖 *Vampir Köylü Botu*\n\n🎮 Oyuna katılmak için aşağıdaki butona tıklayın!",
+                reply_markup=InlineKeyboardMarkup([[
+                    InlineKeyboardButton("🎮 Oyuna Katıl", callback_data=f"pm_join_{group_id}")
+                ]]),
+                parse_mode="Markdown"
+            )
         )
         
         await direct_join_game(user, game, context, query)
         
     except Exception as e:
-        await query.answer("🤖 Botla iletişim kurmanız gerekiyor! Özelden /start yazın.", show_alert=True)
+        await answer_query(query, "🤖 Botla iletişim kurmanız gerekiyor! Özelden /start yazın.", show_alert=True)
         
         help_text = (
-            f"🎮 Merhaba {user.first_name}!\n\n"
+            f"🎮 Merhaba {escape_markdown(user.first_name)}!\n\n"
             f"Oyuna katılmak için:\n"
             f"1. 🤖 @Wwampir_bot'a tıklayın\n"
             f"2. Özelden 'Merhaba' veya /start yazın\n"
@@ -1232,28 +3382,29 @@ async def handle_join_button(query, context: ContextTypes.DEFAULT_TYPE):
 
 async def direct_join_game(user, game: GameState, context: ContextTypes.DEFAULT_TYPE, query=None):
     """Direkt oyuna katıl"""
-    game.add_player(user.id, user.first_name or user.username or "Bilinmeyen")
+    group_id = game.group_id
+    async with group_locks.hold(group_id):
+        added = (
+            game.is_active()
+            and game.phase == GamePhase.LOBBY
+            and game.add_player(user.id, user.first_name or user.username or "Bilinmeyen")
+        )
+        player_count = len(game.players)
+        countdown = update_join_countdown(context, game) if added else None
+        if added:
+            persist_game(game)
+    
+    if not added:
+        return
     
     if query:
-        await query.answer("🎉 Oyuna katıldınız!")
+        await answer_query(query, "🎉 Oyuna katıldınız!")
     
-    await send_mention(context, game.group_id, user.id, "oyuna katıldı! 🎉")
+    post_message(context, group_id, f"{mention_md(group_id, user.id)} oyuna katıldı! 🎉", priority=MessagePriority.NORMAL)
     await update_join_message(context, game)
     
-    player_count = len(game.players)
-    logger.info(f"👥 Grup {game.group_id}: Butonla katılım: {player_count} kişi")
-    
-    if player_count == 5:
-        if game._join_timer_task and not game._join_timer_task.done():
-            game._join_timer_task.cancel()
-        
-        game.join_time_left = 60
-        game._join_timer_task = asyncio.create_task(join_countdown(context, game))
-        
-        await safe_send_message(context, game.group_id, "🎉 5 kişi tamamlandı!\n⏳ 1 dakika içinde başka oyuncu katılmazsa oyun başlayacak.")
-    elif player_count > 5 and game._join_timer_task and not game._join_timer_task.done():
-        game.join_time_left = 60
-        await safe_send_message(context, game.group_id, f"➕ Yeni oyuncu! Süre 60 saniyeye sıfırlandı.\n👥 Toplam: {player_count} oyuncu")
+    logger.info("👥 Grup %s: Butonla katılım: %s kişi", group_id, player_count, extra=game_log(game, user.id))
+    announce_join_countdown(context, game, countdown, player_count)
 
 async def handle_pm_join_button(query, context: ContextTypes.DEFAULT_TYPE):
     """PM'den katılma butonu"""
@@ -1261,37 +3412,38 @@ async def handle_pm_join_button(query, context: ContextTypes.DEFAULT_TYPE):
     parts = query.data.split("_")
     
     if len(parts) < 3:
-        await query.answer("❌ Geçersiz buton!", show_alert=True)
+        await answer_query(query, "❌ Geçersiz buton!", show_alert=True)
         return
     
     try:
         group_id = int(parts[2])
     except ValueError:
-        await query.answer("❌ Geçersiz buton!", show_alert=True)
+        await answer_query(query, "❌ Geçersiz buton!", show_alert=True)
         return
     
-    if group_id not in games:
-        await query.answer("❌ Bu oyun artık aktif değil!", show_alert=True)
+    game = get_game(group_id)
+    if game is None:
+        await answer_query(query, "❌ Bu oyun artık aktif değil!", show_alert=True)
         return
     
-    game = games[group_id]
-    
     if not game.is_active() or game.phase != GamePhase.LOBBY:
-        await query.answer("❌ Bu oyun artık aktif değil!", show_alert=True)
+        await answer_query(query, "❌ Bu oyun artık aktif değil!", show_alert=True)
         return
     
     if user.id in game.players:
-        await query.answer("❌ Zaten bu oyundasınız!", show_alert=True)
+        await answer_query(query, "❌ Zaten bu oyundasınız!", show_alert=True)
         return
     
     await direct_join_game(user, game, context, query)
 
+@metrics.timed("wampir_callback_seconds", handler="button_handler")
+@tracer.traced_handler("button_handler")
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle inline button callbacks"""
     query = update.callback_query
-    await query.answer()
+    await answer_query(query)
     
-    print("🔘 BUTONA TIKLANDI", query.data)
+    logger.debug("🔘 Butona tıklandı: %s", query.data, extra={"user_id": query.from_user.id})
 
     if query.data.startswith("pm_join_"):
         await handle_pm_join_button(query, context)
@@ -1303,56 +3455,57 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     if query.data in ["help_rules", "help_commands"]:
         if query.data == "help_rules":
-            await query.message.edit_text(await wnasıloynanır(update, context))
+            await query.message.edit_text(render_rules(query.message.chat.id), parse_mode="Markdown")
         else:
-            await query.message.edit_text(await wyardim(update, context))
+            await query.message.edit_text(render_help(query.message.chat.id), parse_mode="Markdown")
         return
     
-    if not query.data or not query.data.startswith("target_"):
+    if query.data.startswith("target_"):
+        # Eski biçimli butonlar tur bilgisi taşımaz
+        await answer_query(query, "⏰ Bu butonun süresi doldu! Artık kullanılamaz.", show_alert=True)
         return
     
-    parts = query.data.split("_")
-    if len(parts) < 4:
-        await query.answer("❌ Geçersiz buton!", show_alert=True)
-        return
-
-    try:
-        group_id = int(parts[1])
-        target_id = int(parts[2])
-        button_phase = parts[3]
-    except (ValueError, IndexError):
-        await query.answer("❌ Geçersiz buton!", show_alert=True)
+    if not query.data.startswith(TARGET_PREFIX):
         return
     
-    if group_id not in games:
-        await query.answer("❌ Bu grupta oyun yok!", show_alert=True)
+    decoded = decode_target(query.data)
+    if decoded is None:
+        await answer_query(query, "❌ Geçersiz buton!", show_alert=True)
         return
+    group_id, target_id, button_epoch, button_phase = decoded
     
-    game = games[group_id]
+    game = get_game(group_id)
+    if game is None:
+        await answer_query(query, "❌ Bu grupta oyun yok!", show_alert=True)
+        return
     user_id = query.from_user.id
     
     if not game.is_active():
-        await query.answer("❌ Bu grupta aktif oyun yok!", show_alert=True)
+        await answer_query(query, "❌ Bu grupta aktif oyun yok!", show_alert=True)
+        return
+    
+    if button_epoch != game.epoch & 0xFFFFFFFF:
+        await answer_query(query, "⏰ Bu butonun süresi doldu! Artık kullanılamaz.", show_alert=True)
         return
     
     if user_id not in game.players:
-        await query.answer("❌ Bu oyunda değilsiniz!", show_alert=True)
+        await answer_query(query, "❌ Bu oyunda değilsiniz!", show_alert=True)
         return
     
     player = game.players[user_id]
     if not player.alive:
-        await query.answer("💀 Ölüler oy kullanamaz!", show_alert=True)
+        await answer_query(query, "💀 Ölüler oy kullanamaz!", show_alert=True)
         return
     
     target_player = game.players.get(target_id)
     if not target_player or not target_player.alive:
-        await query.answer("❌ Ölü birine oy veremezsiniz!", show_alert=True)
+        await answer_query(query, "❌ Ölü birine oy veremezsiniz!", show_alert=True)
         return
     
     current_phase = "night" if game.phase == GamePhase.NIGHT else "day" if game.phase == GamePhase.DAY else "other"
     
     if button_phase != current_phase:
-        await query.answer("⏰ Bu butonun süresi doldu! Artık kullanılamaz.", show_alert=True)
+        await answer_query(query, "⏰ Bu butonun süresi doldu! Artık kullanılamaz.", show_alert=True)
         return
     
     if game.phase == GamePhase.NIGHT:
@@ -1360,7 +3513,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     elif game.phase == GamePhase.DAY:
         await handle_day_vote(query, user_id, target_id, context, game)
     else:
-        await query.answer("⚠️ Şu anda oy kullanılamaz.", show_alert=True)
+        await answer_query(query, "⚠️ Şu anda oy kullanılamaz.", show_alert=True)
 
 async def handle_night_action(query, user_id, target_id, context, game):
     """Gece aksiyonları - GERİ BİLDİRİM EKLENDİ"""
@@ -1368,49 +3521,62 @@ async def handle_night_action(query, user_id, target_id, context, game):
     player = game.players[user_id]
     target_player = game.players[target_id]
     
-    if player.role == target_player.role and player.role != ROLES["KOYLU"]:
-        await query.answer("⚠️ Takım arkadaşına aksiyon uygulayamazsın!", show_alert=True)
+    if player.kind == target_player.kind and player.kind != Role.KOYLU:
+        await answer_query(query, "⚠️ Takım arkadaşına aksiyon uygulayamazsın!", show_alert=True)
         return
     
     action_msg = ""
-    if "Vampir" in player.role:
-        if user_id in game.night_actions["vampire"]:
-            await query.answer("⚠️ Zaten oy kullandın!", show_alert=True)
-            return
-        game.night_actions["vampire"][user_id] = target_id
-        action_msg = f"🩸 {target_player.username} ısırıldı!"
-        await safe_send_message(context, group_id, "🧛‍♂️ Bir vampir avına çıktı!")
-    elif "Doktor" in player.role:
-        if game.night_actions["doctor"] is not None:
-            await query.answer("⚠️ Zaten koruma seçtin!", show_alert=True)
-            return
-        game.night_actions["doctor"] = target_id
-        action_msg = f"⛑️ {target_player.username} korundu!"
-        await safe_send_message(context, group_id, "🩺 Doktor şifa dağıtıyor!")
-    elif "Kurt" in player.role:
-        if game.night_actions["kurt"] is not None:
-            await query.answer("⚠️ Zaten av seçtin!", show_alert=True)
-            return
-        game.night_actions["kurt"] = target_id
-        action_msg = f"🐺 {target_player.username} avlandı!"
-        await safe_send_message(context, group_id, "🐺 Alfa Kurt ava çıktı!")
-    else:
-        await query.answer("❌ Bu aşamada oy kullanamazsınız!", show_alert=True)
+    flavour_msg = ""
+    rejection = None
+    async with group_locks.hold(group_id):
+        if game.phase != GamePhase.NIGHT:
+            rejection = "⏰ Bu butonun süresi doldu! Artık kullanılamaz."
+        elif player.kind == Role.VAMPIR:
+            if user_id in game.night_actions["vampire"]:
+                rejection = "⚠️ Zaten oy kullandın!"
+            else:
+                game.night_actions["vampire"][user_id] = target_id
+                action_msg = f"🩸 {target_player.username} ısırıldı!"
+                flavour_msg = "🧛‍♂️ Bir vampir avına çıktı!"
+        elif player.kind == Role.DOKTOR:
+            if game.night_actions["doctor"] is not None:
+                rejection = "⚠️ Zaten koruma seçtin!"
+            else:
+                game.night_actions["doctor"] = target_id
+                action_msg = f"⛑️ {target_player.username} korundu!"
+                flavour_msg = "🩺 Doktor şifa dağıtıyor!"
+        elif player.kind == Role.KURT:
+            if game.night_actions["kurt"] is not None:
+                rejection = "⚠️ Zaten av seçtin!"
+            else:
+                game.night_actions["kurt"] = target_id
+                action_msg = f"🐺 {target_player.username} avlandı!"
+                flavour_msg = "🐺 Alfa Kurt ava çıktı!"
+        else:
+            rejection = "❌ Bu aşamada oy kullanamazsınız!"
+        if not rejection:
+            persist_game(game)
+    
+    if rejection:
+        await answer_query(query, rejection, show_alert=True)
         return
     
+    post_message(context, group_id, flavour_msg)
+    
     geri_bildirim_msg = ""
-    if "Vampir" in player.role:
-        geri_bildirim_msg = f"🎯 *Gece Kararın:* {target_player.username} isimli oyuncuyu ısırdın!\n\n🩸 Bu kişi doktor tarafından korunmazsa ölecek."
-    elif "Doktor" in player.role:
-        geri_bildirim_msg = f"🎯 *Gece Kararın:* {target_player.username} isimli oyuncuyu koruyorsun!\n\n⛑️ Bu kişi vampir saldırısından kurtulacak."
-    elif "Kurt" in player.role:
-        if "Vampir" in target_player.role:
-            geri_bildirim_msg = f"🎯 *Gece Kararın:* {target_player.username} isimli VAMPİR'i avladın!\n\n🐺 Bu wampir ölecek!"
+    if player.kind == Role.VAMPIR:
+        geri_bildirim_msg = f"🎯 *Gece Kararın:* {target_player.md_name} isimli oyuncuyu ısırdın!\n\n🩸 Bu kişi doktor tarafından korunmazsa ölecek."
+    elif player.kind == Role.DOKTOR:
+        geri_bildirim_msg = f"🎯 *Gece Kararın:* {target_player.md_name} isimli oyuncuyu koruyorsun!\n\n⛑️ Bu kişi vampir saldırısından kurtulacak."
+    elif player.kind == Role.KURT:
+        if target_player.kind == Role.VAMPIR:
+            geri_bildirim_msg = f"🎯 *Gece Kararın:* {target_player.md_name} isimli VAMPİR'i avladın!\n\n🐺 Bu wampir ölecek!"
         else:
-            geri_bildirim_msg = f"🎯 *Gece Kararın:* {target_player.username} isimli oyuncuyu avlamaya çalıştın!\n\n⚠️ Bu kişi wampir değil, zarar veremezsin."
+            geri_bildirim_msg = f"🎯 *Gece Kararın:* {target_player.md_name} isimli oyuncuyu avlamaya çalıştın!\n\n⚠️ Bu kişi wampir değil, zarar veremezsin."
     
-    await safe_send_pm(user_id, geri_bildirim_msg)
-    await query.answer(action_msg)
+    # Grup ve PM gönderimleri kuyrukta - callback sohbetlerin hız sınırını beklemeden döner
+    post_pm(user_id, geri_bildirim_msg)
+    await answer_query(query, action_msg)
 
 async def handle_day_vote(query, user_id, target_id, context, game):
     """Handle day voting"""
@@ -1418,62 +3584,247 @@ async def handle_day_vote(query, user_id, target_id, context, game):
     player = game.players[user_id]
     target_player = game.players[target_id]
     
-    if user_id in game.votes:
-        await query.answer("⚠️ Zaten oy kullandınız!", show_alert=True)
+    async with group_locks.hold(group_id):
+        if game.phase != GamePhase.DAY:
+            rejection = "⏰ Bu butonun süresi doldu! Artık kullanılamaz."
+        elif not game.tally.add(user_id, target_id):
+            rejection = "⚠️ Zaten oy kullandınız!"
+        else:
+            rejection = None
+            all_voted = len(game.tally) >= len(game.expected_voters)
+            persist_game(game)
+    
+    if rejection:
+        await answer_query(query, rejection, show_alert=True)
         return
     
-    game.votes[user_id] = target_id
     action_msg = f"🗳️ {target_player.username} için oy verdiniz!"
     
-    await query.answer(action_msg)
-    logger.info(f"Grup {group_id}: 🗳️ {player.username} -> {target_player.username} oy verdi")
+    await answer_query(query, action_msg)
+    logger.info("Grup %s: 🗳️ %s -> %s oy verdi", group_id, player.username, target_player.username, extra=game_log(game, user_id))
     
-    vote_announcement = (
-        f"🗳️ [{player.username}](tg://user?id={user_id}), "
-        f"[{target_player.username}](tg://user?id={target_id})'yi linç etmeyi seçti!"
-    )
+    if VOTE_LIVE_TALLY and not all_voted:
+        get_vote_editor(context, game).touch()
     
-    await safe_send_message(context, group_id, vote_announcement, parse_mode="Markdown")
+    if VOTE_ANNOUNCEMENTS:
+        vote_announcement = (
+            f"🗳️ [{player.md_name}](tg://user?id={user_id}), "
+            f"[{target_player.md_name}](tg://user?id={target_id})'yi linç etmeyi seçti!"
+        )
+        post_message(context, group_id, vote_announcement)
     
-    if len(game.votes) >= len(game.expected_voters):
-        logger.info(f"Grup {group_id}: 🗳️ Herkes oy kullandı! Oylama erken bitiyor...")
-        if game._timer_task and not game._timer_task.done():
-            game._timer_task.cancel()
-        await end_day(context, game)
+    if all_voted:
+        logger.info("Grup %s: 🗳️ Herkes oy kullandı! Oylama erken bitiyor...", group_id, extra=game_log(game))
+        game.cancel_phase_timer()
+        # Sonuçlar, duraklamalar ve yeni gece oyunun geçiş görevinde - bu callback hemen döner
+        schedule_transition(game, lambda: end_day(context, game), "end_day")
 
 # === MAIN APPLICATION ===
 
-def main():
-    """Basit main fonksiyonu"""
+async def on_startup(application):
+    """Application başlarken çalışan hazırlıklar"""
+    if MEDIA_WARMUP_CHAT_ID and SHARD_INDEX == 0:
+        await warm_media_cache(application.bot, int(MEDIA_WARMUP_CHAT_ID))
+    group_durations.update(await asyncio.to_thread(snapshots.load_durations))
+    await restore_games(application)
+    if GAME_IDLE_TTL > 0:
+        application.create_task(eviction_loop())
+    global metrics_server
+    metrics_server = await start_metrics_server()
+
+async def on_shutdown(application):
+    """Kapanışta bekleyen anlık görüntüleri diske yaz"""
+    global metrics_server
+    if metrics_server is not None:
+        metrics_server.close()
+        metrics_server = None
+    await snapshots.flush()
+    snapshots.close()
+
+def build_application(bot: Optional[telegram.Bot] = None):
+    """Application'ı kur ve handler'ları kaydet - bot verilirse (ör. sahte bot) o kullanılır"""
     global app
     
-    logger.info("🧛‍♂️ Vampir Köylü Botu başlatılıyor...")
-    
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    builder = ApplicationBuilder().bot(bot) if bot else ApplicationBuilder().token(BOT_TOKEN)
+    app = (
+        builder.concurrent_updates(CONCURRENT_UPDATES)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
     
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("wstart", wstart))
     app.add_handler(CommandHandler("wjoin", wjoin))
     app.add_handler(CommandHandler("wson", wson))
+    app.add_handler(CommandHandler("wsure", wsure))
+    app.add_handler(CommandHandler("wtrace", wtrace))
     app.add_handler(CommandHandler("wyardim", wyardim))
     app.add_handler(CommandHandler("wnasiloynanir", wnasıloynanır))
     app.add_handler(CallbackQueryHandler(button_handler))
     
     async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
-        logger.error(f"Error: {context.error}")
+        logger.error("Error: %s", context.error)
     
     app.add_error_handler(error_handler)
+    return app
+
+def run_webhook(application):
+    """Gömülü HTTP sunucusuyla webhook modunda çalıştır"""
+    url_path = WEBHOOK_PATH.strip("/")
+    webhook_url = f"{WEBHOOK_URL.rstrip('/')}/{url_path}"
+    logger.info("🌐 Webhook modu: %s:%s/%s -> %s", WEBHOOK_LISTEN, WEBHOOK_PORT, url_path, webhook_url)
+    
+    application.run_webhook(
+        listen=WEBHOOK_LISTEN,
+        port=WEBHOOK_PORT,
+        url_path=url_path,
+        webhook_url=webhook_url,
+        secret_token=WEBHOOK_SECRET,
+        max_connections=WEBHOOK_MAX_CONNECTIONS,
+        drop_pending_updates=True
+    )
+
+# === SHARDED WORKERS ===
+
+def callback_group_id(data: str) -> Optional[int]:
+    """Hedef butonu ve pm_join_ callback_data'sına gömülü grup id'si"""
+    if data.startswith(TARGET_PREFIX):
+        decoded = decode_target(data)
+        return decoded[0] if decoded else None
+    if data.startswith("pm_join_"):
+        try:
+            return int(data[len("pm_join_"):])
+        except ValueError:
+            return None
+    return None
+
+def route_key(update: Update) -> Optional[int]:
+    """Update'in yönlendirme anahtarı: grup id'si, yoksa özel sohbet/kullanıcı id'si
+    
+    PM'deki oy ve katılma butonları callback_data'daki grup id'siyle
+    o grubun worker'ına gider.
+    """
+    query = update.callback_query
+    if query and query.data:
+        group_id = callback_group_id(query.data)
+        if group_id is not None:
+            return group_id
+    if update.effective_chat:
+        return update.effective_chat.id
+    if update.effective_user:
+        return update.effective_user.id
+    return None
+
+def shard_for(key: Optional[int], count: int) -> int:
+    return 0 if key is None else key % count
+
+def owns_group(group_id: int) -> bool:
+    """Bu süreç grubun sahibi mi"""
+    return SHARD_COUNT <= 1 or shard_for(group_id, SHARD_COUNT) == SHARD_INDEX
+
+async def route_updates(queues: list):
+    """Router: getUpdates ile Update'leri çek ve sahip worker'ın kuyruğuna koy"""
+    bot = telegram.Bot(BOT_TOKEN)
+    offset = None
+    async with bot:
+        await bot.delete_webhook(drop_pending_updates=True)
+        logger.info("🔀 Router aktif: %s worker", len(queues))
+        while True:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=30, allowed_updates=Update.ALL_TYPES)
+            except telegram.error.TimedOut:
+                continue
+            except RetryAfter as e:
+                delay = retry_after_seconds(e)
+                logger.warning("⏳ Router getUpdates 429 aldı, %.1f sn bekleniyor", delay)
+                await asyncio.sleep(delay)
+                continue
+            except telegram.error.NetworkError as e:
+                logger.error("Router getUpdates hatası: %s", e)
+                await asyncio.sleep(1)
+                continue
+            except telegram.error.TelegramError as e:
+                # Conflict (başka bir getUpdates/webhook) vb. - router kapanırsa tüm worker'lar durur
+                logger.error("Router getUpdates Telegram hatası: %s", e)
+                await asyncio.sleep(ROUTER_ERROR_DELAY)
+                continue
+            for update in updates:
+                offset = update.update_id + 1
+                queues[shard_for(route_key(update), len(queues))].put(update.to_dict())
+
+async def serve_worker(application, queue):
+    """Worker: router'dan gelen Update'leri kendi Application'ında işle"""
+    loop = asyncio.get_running_loop()
+    async with application:
+        await on_startup(application)
+        await application.start()
+        logger.info("🧛‍♂️ Worker %s/%s aktif", SHARD_INDEX + 1, SHARD_COUNT)
+        try:
+            while True:
+                data = await loop.run_in_executor(None, queue.get)
+                if data is None:
+                    break
+                await application.update_queue.put(Update.de_json(data, application.bot))
+        finally:
+            await application.stop()
+            await on_shutdown(application)
+
+def run_worker(index: int, count: int, queue):
+    """Worker sürecinin giriş noktası"""
+    global SHARD_INDEX, SHARD_COUNT
+    SHARD_INDEX, SHARD_COUNT = index, count
+    # Global hız sınırı bot token'ı başınadır - worker'lar arasında paylaştırılır
+    outbound.global_per_second = max(1, OUTBOUND_GLOBAL_PER_SECOND // count)
+    build_application()
+    try:
+        asyncio.run(serve_worker(app, queue))
+    except KeyboardInterrupt:
+        pass
+
+def run_sharded(count: int):
+    """N worker süreci başlat ve bu süreçte router'ı çalıştır"""
+    mp = multiprocessing.get_context("spawn")
+    queues = [mp.Queue() for _ in range(count)]
+    workers = [
+        mp.Process(target=run_worker, args=(index, count, queue), name=f"wampir-worker-{index}")
+        for index, queue in enumerate(queues)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        asyncio.run(route_updates(queues))
+    except KeyboardInterrupt:
+        logger.info("Router kapatılıyor...")
+    finally:
+        for queue in queues:
+            queue.put(None)
+        for worker in workers:
+            worker.join(timeout=15)
+
+def main():
+    """Basit main fonksiyonu - WEBHOOK_URL varsa webhook, yoksa polling"""
+    logger.info("🧛‍♂️ Vampir Köylü Botu başlatılıyor...")
+    
+    if WORKER_COUNT > 1:
+        run_sharded(WORKER_COUNT)
+        return
+    
+    build_application()
     
     logger.info("🧛‍♂️ Vampir Köylü Botu aktif!")
     print("🧛‍♂️ Vampir Köylü Botu Aktif!")
     print("Grup chat'inde /wstart yazın!")
     
     try:
-        app.run_polling(drop_pending_updates=True)
+        if WEBHOOK_URL:
+            run_webhook(app)
+        else:
+            app.run_polling(drop_pending_updates=True)
     except KeyboardInterrupt:
         logger.info("Bot kapatılıyor...")
     except Exception as e:
-        logger.error(f"Bot hatası: {e}")
+        logger.error("Bot hatası: %s", e)
 
 if __name__ == "__main__":
     main()
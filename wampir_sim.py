@@ -0,0 +1,239 @@
+"""Telegram'sız oyun motoru yük testi
+
+Gerçek bot token'ı olmadan wampir_bot.py'nin handler'larını sahte bir Bot ile
+çalıştırır: binlerce sentetik oyun aynı anda açılır, oyuncular senaryoya göre
+gece aksiyonu ve gündüz oyu verir. Sahte bot gönderimleri kaydeder, gecikme
+ve 429 (RetryAfter) ekleyebilir.
+
+Örnekler:
+    python wampir_sim.py --games 200 --players 8
+    python wampir_sim.py --games 1000 --warp 1000
+    python wampir_sim.py --games 50 --latency-ms 100:300 --flood-rate 0.02 --telegram-limits
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import random
+import statistics
+import time
+from collections import Counter
+from datetime import timedelta
+
+import telegram
+from telegram import Update
+from telegram.error import RetryAfter
+
+import wampir_bot as wb
+from webhook_harness import callback_update, command_update
+
+SEND_ENDPOINTS = {"sendMessage", "sendPhoto", "editMessageText", "editMessageReplyMarkup", "pinChatMessage"}
+
+class FakeBot(telegram.Bot):
+    """Bot API çağrılarını ağa çıkmadan yanıtlayan sahte Bot
+
+    Her çağrı kaydedilir; gönderilen inline klavyeler sohbet başına tutulur ki
+    sürücü oyuncular gibi butonlara basabilsin.
+    """
+
+    def __init__(self, latency=(0.0, 0.0), flood_rate: float = 0.0, retry_after: float = 1.0):
+        super().__init__(token="123456:FAKE")
+        # telegram.Bot kurulumdan sonra dondurulur
+        with self._unfrozen():
+            self.latency = latency
+            self.flood_rate = flood_rate
+            self.retry_after = retry_after
+            self.calls: Counter = Counter()
+            self.injected: Counter = Counter()
+            self.keyboards = {}  # chat_id -> InlineKeyboardMarkup
+            self._message_ids = itertools.count(1)
+
+    async def _do_post(self, endpoint, data, **kwargs):
+        low, high = self.latency
+        if high:
+            await asyncio.sleep(random.uniform(low, high))
+        if endpoint in SEND_ENDPOINTS and random.random() < self.flood_rate:
+            self.injected[endpoint] += 1
+            raise RetryAfter(timedelta(seconds=self.retry_after))
+        self.calls[endpoint] += 1
+
+        if endpoint == "getMe":
+            return {"id": 123456, "is_bot": True, "first_name": "Wampir", "username": "Wwampir_bot"}
+
+        chat_id = data.get("chat_id")
+        if endpoint in ("sendMessage", "sendPhoto", "editMessageText", "editMessageReplyMarkup"):
+            if "reply_markup" in data:
+                self.keyboards[chat_id] = data["reply_markup"]
+            elif endpoint == "editMessageReplyMarkup":
+                self.keyboards.pop(chat_id, None)
+            message = {
+                "message_id": data.get("message_id") or next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "supergroup" if chat_id < 0 else "private"},
+            }
+            if endpoint == "sendPhoto":
+                message["photo"] = [{"file_id": "FAKE_PHOTO", "file_unique_id": "FAKE", "width": 1200, "height": 800}]
+                message["caption"] = data.get("caption")
+            else:
+                message["text"] = data.get("text")
+            return message
+        return True
+
+    def sent_messages(self) -> int:
+        return sum(self.calls[endpoint] for endpoint in SEND_ENDPOINTS)
+
+class Driver:
+    """Sentetik oyunları oynatan ve callback gecikmelerini ölçen sürücü"""
+
+    def __init__(self, application, bot: FakeBot, players: int, poll: float):
+        self.application = application
+        self.bot = bot
+        self.players = players
+        self.poll = poll
+        self.latencies = []
+        self.finished = 0
+        self.errors = 0
+
+    async def dispatch(self, data: dict, measure: bool = True):
+        update = Update.de_json(data, self.bot)
+        started = time.monotonic()
+        await self.application.process_update(update)
+        if measure:
+            self.latencies.append((time.monotonic() - started) * 1000)
+
+    async def click(self, chat_id: int, user_id: int, player_name: str):
+        """Sohbetteki son klavyede oyuncunun adını taşıyan butona bas"""
+        markup = self.bot.keyboards.get(chat_id)
+        if markup is None:
+            return
+        for row in markup.inline_keyboard:
+            for button in row:
+                if button.text.split(" ")[0] == player_name:
+                    await self.dispatch(callback_update(chat_id, user_id, button.callback_data))
+                    return
+
+    async def play_night(self, game: wb.GameState):
+        alive = game.get_alive_players()
+        for user_id in list(game.expected_voters):
+            player = game.players.get(user_id)
+            if player is None or game.phase != wb.GamePhase.NIGHT:
+                break  # gece bitti ya da oyun kapandı
+            if player.kind == wb.Role.VAMPIR:
+                choices = [p for p in alive if p.kind != wb.Role.VAMPIR]
+            else:
+                choices = [p for p in alive if p.user_id != user_id]
+            if choices:
+                await self.click(user_id, user_id, random.choice(choices).username)
+
+    async def play_day(self, game: wb.GameState, group_id: int):
+        alive = game.get_alive_players()
+        suspect = random.choice(alive)
+        for player in alive:
+            # Çoğunluk ortak bir şüpheliye oy verir, kalanlar rastgele
+            target = suspect if random.random() < 0.7 else random.choice(alive)
+            await self.click(group_id, player.user_id, target.username)
+            if game.phase != wb.GamePhase.DAY:
+                break
+
+    async def play(self, index: int):
+        group_id = -1_000_000_000_000 - index
+        user_ids = [10_000_000 + index * 100 + n for n in range(self.players)]
+
+        await self.dispatch(command_update(group_id, user_ids[0], "/wstart"), measure=False)
+        game = wb.games.get(group_id)
+        if game is None:
+            self.errors += 1
+            return
+        for user_id in user_ids:
+            await self.dispatch(callback_update(group_id, user_id, "join_game"))
+
+        handled = None
+        while wb.games.get(group_id) is game and game.is_active():
+            await asyncio.sleep(self.poll)
+            token = (game.timer_kind, id(game._phase_timer))
+            if token == handled:
+                continue
+            if game.phase == wb.GamePhase.NIGHT and game.timer_kind == "night":
+                handled = token
+                await self.play_night(game)
+            elif game.phase == wb.GamePhase.DAY and game.timer_kind == "voting":
+                handled = token
+                await self.play_day(game, group_id)
+        while wb.games.get(group_id) is game:
+            await asyncio.sleep(self.poll)
+        self.finished += 1
+
+async def run(args) -> None:
+    bot = FakeBot(
+        latency=tuple(float(part) / 1000 for part in args.latency_ms.split(":")),
+        flood_rate=args.flood_rate,
+        retry_after=args.retry_after
+    )
+    application = wb.build_application(bot=bot)
+    driver = Driver(application, bot, args.players, args.poll)
+
+    async def count_errors(update, context):
+        driver.errors += 1
+    application.add_error_handler(count_errors)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(index: int):
+        async with semaphore:
+            await driver.play(index)
+
+    async with application:
+        started = time.monotonic()
+        await asyncio.gather(*(limited(index) for index in range(args.games)))
+        elapsed = time.monotonic() - started
+
+    report(driver, bot, elapsed)
+    if args.metrics:
+        print(wb.metrics.render())
+    if args.traces:
+        print(wb.tracer.render(args.traces))
+        print(wb.transition_tracer.render(args.traces))
+
+def report(driver: Driver, bot: FakeBot, elapsed: float):
+    latencies = sorted(driver.latencies)
+    games = max(1, driver.finished)
+    print(f"🎮 {driver.finished} oyun {elapsed:.1f} sn'de bitti - {driver.finished / elapsed * 60:.1f} oyun/dk")
+    if latencies:
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"⏱️ {len(latencies)} callback - p50: {statistics.median(latencies):.1f} ms, p99: {p99:.1f} ms, max: {latencies[-1]:.1f} ms")
+    print(f"📨 Oyun başına mesaj: {bot.sent_messages() / games:.1f}")
+    for endpoint, count in bot.calls.most_common():
+        print(f"   {endpoint}: {count / games:.1f}")
+    print(f"🚦 Eklenen 429: {sum(bot.injected.values())} - kuyruk: {wb.outbound.stats} - hata: {driver.errors}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Sahte Telegram botuyla oyun motoru yük testi")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--players", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=1000, help="aynı anda oynanan oyun sayısı")
+    parser.add_argument("--latency-ms", default="0:0", help="Bot API gecikmesi aralığı, ör. 100:300")
+    parser.add_argument("--flood-rate", type=float, default=0.0, help="gönderimlerde 429 olasılığı")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--warp", type=float, default=100.0, help="oyun saatinin hızlandırma katsayısı")
+    parser.add_argument("--phase-seconds", type=float, default=None, help="lobi/gece/tartışma/oylama süresi (oyun saniyesi)")
+    parser.add_argument("--telegram-limits", action="store_true", help="gerçek Telegram hız sınırlarını uygula")
+    parser.add_argument("--poll", type=float, default=0.05)
+    parser.add_argument("--metrics", action="store_true", help="bitişte Prometheus metriklerini yazdır")
+    parser.add_argument("--traces", type=int, default=0, help="bitişte en yavaş N callback ve faz geçişi izini yazdır")
+    args = parser.parse_args()
+
+    logging.getLogger(wb.__name__).setLevel(logging.WARNING)
+    wb.media_cache.path = None
+    wb.snapshots.path = None
+    wb.set_clock(wb.WarpClock(args.warp))
+    if args.phase_seconds is not None:
+        wb.JOIN_SECONDS = wb.NIGHT_SECONDS = wb.DISCUSSION_SECONDS = wb.VOTING_SECONDS = args.phase_seconds
+    if not args.telegram_limits:
+        wb.outbound.global_per_second = 10 ** 9
+        wb.outbound.chat_interval = 0
+        wb.outbound.group_per_minute = 10 ** 9
+
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Webhook modu için yerel test aracı
+
+Çalışan bir webhook sunucusuna (WEBHOOK_URL ile başlatılmış wampir_bot.py)
+sahte Telegram Update JSON'ları POST eder ve her isteğin gecikmesini ölçer.
+
+Örnekler:
+    python webhook_harness.py lobby --players 6
+    python webhook_harness.py callback join_game --chat -1001234 --user 7
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import time
+
+import httpx
+
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', 'telegram')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+
+_update_ids = itertools.count(int(time.time()))
+_message_ids = itertools.count(1)
+
+def make_user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"Oyuncu{user_id}"}
+
+def make_chat(chat_id: int) -> dict:
+    if chat_id < 0:
+        return {"id": chat_id, "type": "supergroup", "title": "Webhook Test"}
+    return {"id": chat_id, "type": "private", "first_name": f"Oyuncu{chat_id}"}
+
+def command_update(chat_id: int, user_id: int, command: str) -> dict:
+    """Komut mesajı içeren sahte Update"""
+    return {
+        "update_id": next(_update_ids),
+        "message": {
+            "message_id": next(_message_ids),
+            "date": int(time.time()),
+            "chat": make_chat(chat_id),
+            "from": make_user(user_id),
+            "text": command,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(command.split()[0])}],
+        },
+    }
+
+def callback_update(chat_id: int, user_id: int, data: str) -> dict:
+    """Inline buton tıklaması içeren sahte Update"""
+    return {
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": str(next(_update_ids)),
+            "from": make_user(user_id),
+            "chat_instance": str(chat_id),
+            "data": data,
+            "message": {
+                "message_id": next(_message_ids),
+                "date": int(time.time()),
+                "chat": make_chat(chat_id),
+            },
+        },
+    }
+
+async def post_updates(url: str, updates: list, secret: str = None, concurrency: int = 1) -> list:
+    """Update'leri POST et - her biri için (HTTP durum kodu, gecikme ms) döner"""
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        async def post(update: dict):
+            async with semaphore:
+                started = time.monotonic()
+                response = await client.post(url, json=update, headers=headers)
+                return response.status_code, (time.monotonic() - started) * 1000
+
+        return await asyncio.gather(*(post(update) for update in updates))
+
+def report(results: list):
+    latencies = sorted(latency for _, latency in results)
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    print(f"📨 {len(results)} istek - durum kodları: {statuses}")
+    if latencies:
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"⏱️ p50: {statistics.median(latencies):.1f} ms, p99: {p99:.1f} ms, max: {latencies[-1]:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Webhook sunucusuna sahte Update gönder")
+    parser.add_argument("scenario", choices=["lobby", "command", "callback"])
+    parser.add_argument("data", nargs="?", default="/wyardim", help="komut metni veya callback_data")
+    parser.add_argument("--url", default=f"http://127.0.0.1:{WEBHOOK_PORT}/{WEBHOOK_PATH.strip('/')}")
+    parser.add_argument("--secret", default=WEBHOOK_SECRET)
+    parser.add_argument("--chat", type=int, default=-1000000000001)
+    parser.add_argument("--user", type=int, default=1001)
+    parser.add_argument("--players", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.scenario == "lobby":
+        # /wstart + N oyuncunun "🎮 Oyuna Katıl" butonuna tıklaması
+        updates = [command_update(args.chat, args.user, "/wstart")]
+        updates += [
+            callback_update(args.chat, args.user + i, "join_game")
+            for i in range(args.players)
+        ]
+    elif args.scenario == "command":
+        updates = [command_update(args.chat, args.user, args.data)]
+    else:
+        updates = [callback_update(args.chat, args.user, args.data)]
+
+    results = asyncio.run(post_updates(args.url, updates, args.secret, args.concurrency))
+    report(results)
+
+if __name__ == "__main__":
+    main()